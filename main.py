@@ -7,35 +7,216 @@
 # THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import sys
 import time
+import argparse
 from modules.InputHandler import InputHandler
 from modules.MotionSystem import MotionSystem
 from plugins.outputs.communication.DriverSerial import DriverSerial
+from modules.PipelineProcesses import runPipeline
+from modules.AutoCalibration import AutoCalibrator
+from plugins.outputs.communication.DriverPoseUDP import DriverPoseUDP
+from plugins.inputs.ProtocolHandlerPoseUDP import ProtocolHandlerPoseUDP
+from utils.MetricsExporter import MetricsExporter
+from utils.RealtimeTuning import RealtimeTuning
+from utils.BiquadFilter import loadFilterBank
+from utils.LivePublisher import LivePublisher
+
+def parseArgs():
+	parser = argparse.ArgumentParser(description="Game motion sim control")
+	parser.add_argument("--port", help="Serial port of the motion controller, skips the interactive port list")
+	parser.add_argument("--update-ms", type=int, default=10, help="Serial output interval in milliseconds")
+	parser.add_argument("--dashboard", action="store_true", help="Show the live diagnostics dashboard")
+	parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this localhost port")
+	parser.add_argument("--multiprocess", action="store_true",
+		help="Run input and output in separate processes linked by shared memory")
+	parser.add_argument("--realtime", action="store_true",
+		help="Pin CPU, raise priority and schedule GC in idle gaps after a jitter baseline")
+	parser.add_argument("--realtime-fifo", type=int, metavar="PRIORITY",
+		help="With --realtime, use SCHED_FIFO at this priority where permitted")
+	parser.add_argument("--forward", action="append", default=[], metavar="HOST:PORT[@HZ]",
+		help="Re-send game telemetry to another local consumer, optionally rate limited, may be repeated")
+	parser.add_argument("--record", metavar="DIR", help="Record every pipeline stage per output frame to DIR")
+	parser.add_argument("--calibrate", choices=["propose", "apply"],
+		help="Learn game ranges while driving, report them on exit or apply them as they settle")
+	parser.add_argument("--filters", metavar="FILE", help="Filter bank designed by tools.SpectralAnalysis")
+	parser.add_argument("--publish", action="store_true",
+		help="Publish live telemetry, pose and commands to shared memory for local tools")
+	parser.add_argument("--send-poses", metavar="HOST:PORT",
+		help="Split-host game side, stream normalized poses to a rig controller instead of driving serial")
+	parser.add_argument("--receive-poses", metavar="[HOST:]PORT",
+		help="Split-host rig side, drive serial from poses streamed by --send-poses")
+	args = parser.parse_args()
+	rejectUnsupported(parser, args)
+	return args
+
+
+# Options each alternative run mode does not wire up, rejected rather than silently ignored
+unsupportedOptions = {
+	"--send-poses": ["--receive-poses", "--multiprocess", "--port", "--dashboard", "--metrics-port", "--realtime",
+		"--record", "--calibrate", "--filters", "--publish"],
+	"--receive-poses": ["--multiprocess", "--forward", "--dashboard", "--metrics-port", "--record", "--calibrate",
+		"--publish"],
+	"--multiprocess": ["--dashboard", "--metrics-port", "--record", "--calibrate", "--publish"],
+}
+
+
+def rejectUnsupported(parser: argparse.ArgumentParser, args):
+	for mode, options in unsupportedOptions.items():
+		if getattr(args, mode[2:].replace("-", "_")):
+			for option in options:
+				if getattr(args, option[2:].replace("-", "_")):
+					parser.error(option + " is not supported with " + mode)
+	if args.realtime_fifo is not None and not args.realtime:
+		parser.error("--realtime-fifo requires --realtime")
+
+
+def parseForwardTarget(target: str) -> (str, int, float):
+	address, _, rate = target.partition("@")
+	host, _, port = address.rpartition(":")
+	return host or "127.0.0.1", int(port), float(rate or 0)
+
+
+def parseAddress(address: str, defaultHost: str) -> (str, int):
+	host, _, port = address.rpartition(":")
+	return host or defaultHost, int(port)
+
+
+def setupFilters(motionSystem: MotionSystem, args):
+	if args.filters:
+		motionSystem.loadFilterBank(loadFilterBank(args.filters, 1000.0 / args.update_ms))
+
+
+def searchForGame(inputSystem: InputHandler):
+	for i in range(10):
+		if inputSystem.gameSearch():
+			print("Game found")
+			break
+		x = i
+		sys.stdout.write('\rSearching for game' + "." * x)
+		time.sleep(1)
+		sys.stdout.flush()
+
+
+def runPoseSender(args):
+	"""
+	Gaming PC side of split-host mode, decode and cue here and send the pose on
+	"""
+	inputSystem = InputHandler()
+	inputSystem.setupPlugin()
+	for target in args.forward:
+		inputSystem.addForwardTarget(*parseForwardTarget(target))
+	inputSystem.poseSender = DriverPoseUDP(*parseAddress(args.send_poses, "127.0.0.1"))
+	while True:
+		if inputSystem.gameStatus() is True:
+			inputSystem.update()
+		else:
+			searchForGame(inputSystem)
+
+
+def runPoseReceiver(args, reportInterval: float = 5.0):
+	"""
+	Rig controller side of split-host mode, owns the MotionSystem and the serial port
+	"""
+	comHandler = DriverSerial(args.update_ms)
+	if args.port:
+		comHandler.openPort(args.port)
+	else:
+		comHandler.selectSerial()
+	receiver = ProtocolHandlerPoseUDP()
+	receiver.openUDP(*parseAddress(args.receive_poses, "0.0.0.0"))
+	motionSystem = MotionSystem(2, "SMC3")
+	setupFilters(motionSystem, args)
+	realtime = RealtimeTuning(fifoPriority=args.realtime_fifo) if args.realtime else None
+	lastReport = time.time()
+	while True:
+		comHandler.waitReady()
+		motionSystem.inputMotion(receiver.getPose())
+		comHandler.sendCommand(motionSystem.outputCommand())
+		if realtime is not None:
+			realtime.idle(comHandler)
+		if time.time() - lastReport >= reportInterval:
+			lastReport = time.time()
+			print(receiver.statsLine())
+
 
 def main():
+	args = parseArgs()
+	if args.send_poses:
+		runPoseSender(args)
+		return
+	if args.receive_poses:
+		runPoseReceiver(args)
+		return
+	if args.multiprocess:
+		# The output process cannot prompt for a port, pick it here
+		runPipeline(args.port or DriverSerial().finder.listPorts(), args.update_ms, args.realtime, args.realtime_fifo,
+			[parseForwardTarget(target) for target in args.forward], filterPath=args.filters)
+		return
 	# Get serial port list
-	comHandler = DriverSerial()
-	comHandler.selectSerial()
+	comHandler = DriverSerial(args.update_ms)
+	if args.port:
+		comHandler.openPort(args.port)
+	else:
+		comHandler.selectSerial()
 	inputSystem = InputHandler()
 	inputSystem.setupPlugin()
+	for target in args.forward:
+		inputSystem.addForwardTarget(*parseForwardTarget(target))
 	motionSystem = MotionSystem(2, "SMC3")
+	setupFilters(motionSystem, args)
 	motionSystem.inputMotion(inputSystem.getDataFrame())
+	reporter = inputSystem.reporter
+	if args.dashboard:
+		inputSystem.telemetryDebug = True
+		inputSystem.axisOutputDebug = True
+		reporter.start()
+	if args.metrics_port:
+		MetricsExporter(inputSystem, motionSystem, comHandler, port=args.metrics_port).start()
+	realtime = RealtimeTuning(fifoPriority=args.realtime_fifo) if args.realtime else None
+	if args.calibrate:
+		inputSystem.calibrator = AutoCalibrator(inputSystem)
+		if args.calibrate == "apply":
+			inputSystem.calibrator.applyInterval = inputSystem.calibrator.minimumSamples
+	publisher = None
+	if args.publish:
+		try:
+			publisher = LivePublisher(len(motionSystem.axisHandlers))
+		except FileExistsError as err:
+			sys.exit(str(err))
+		inputSystem.publisher = publisher
+		motionSystem.publisher = publisher
+	recorder = None
+	if args.record:
+		# numpy is only needed when recording
+		from utils.SessionRecorder import SessionRecorder
+		recorder = SessionRecorder(args.record, len(motionSystem.axisHandlers), filters=args.filters)
 
-	while True:
-		if inputSystem.gameStatus() is True:
-			inputSystem.update()
-			if comHandler.isReady() is True:
-				motionSystem.inputMotion(inputSystem.getDataFrame())
-				messagebytes = motionSystem.outputCommand()
-				comHandler.sendCommand(messagebytes)
-		else:
-			for i in range(10):
-				if inputSystem.gameSearch():
-					print("Game found")
-					break
-				x = i
-				sys.stdout.write('\rSearching for game' + "." * x)
-				time.sleep(1)
-				sys.stdout.flush()
+	try:
+		while True:
+			if inputSystem.gameStatus() is True:
+				# Never block on telemetry past the point the next serial slot needs polling
+				inputSystem.update(min(comHandler.timeUntilReady(), 1.0 / 60.0))
+				if comHandler.isReady() is True:
+					motionSystem.inputMotion(inputSystem.getDataFrame())
+					messagebytes = motionSystem.outputCommand()
+					comHandler.sendCommand(messagebytes)
+					if recorder is not None:
+						recorder.recordFrame(inputSystem, motionSystem)
+					if realtime is not None:
+						realtime.idle(comHandler)
+					if args.dashboard:
+						reporter.snapshotAxes(motionSystem.commands)
+				if args.dashboard:
+					reporter.markLoop()
+			else:
+				searchForGame(inputSystem)
+				comHandler.resetTimer()
+	finally:
+		if recorder is not None:
+			recorder.close()
+		if inputSystem.calibrator is not None:
+			print(inputSystem.calibrator.report())
+		if publisher is not None:
+			publisher.close()
 
 
 if __name__ == "__main__":
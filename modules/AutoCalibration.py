@@ -0,0 +1,122 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from utils.DataFrame import DataFrame
+from utils.P2Quantile import P2Quantile
+
+"""
+AutoCalibrator learns per-channel game ranges while driving. Each new telemetry frame's raw pose (degrees and game
+units, before clamping) feeds a pair of streaming quantile estimators per channel, and every sample outside the
+ranges currently in use by InputHandler is counted as a clip. Proposed ranges put the chosen low/high quantiles at
+the ends of travel with a margin, kept symmetric by default so the neutral pose stays centred. Applied ranges are
+blended in over rampSamples frames so the normalized output does not jump mid-drive.
+
+Yaw is left out, it is a heading rather than a displacement and is not scaled into the output.
+"""
+class AutoCalibrator:
+	def __init__(self, inputSystem, lowQuantile: float = 0.01, highQuantile: float = 0.99, margin: float = 1.1,
+			symmetric: bool = True):
+		self.inputSystem = inputSystem
+		self.channels = ["pitch", "roll", "surge", "sway", "heave"]
+		self.margin = margin
+		self.symmetric = symmetric
+		self.minimumSamples: int = 1800		# 30 s of 60Hz telemetry frames before ranges are proposed
+		self.applyInterval: int = 0			# samples between automatic applies, 0 only proposes
+		self.rampSamples: int = 300			# samples an applied proposal is blended in over
+		self.rampFrom = None				# (minimums, maximums) in use when the current ramp started
+		self.rampTo = None					# (minimums, maximums) being ramped to, None when not ramping
+		self.rampStep: int = 0
+		self.lowEstimators = [P2Quantile(lowQuantile) for _ in self.channels]
+		self.highEstimators = [P2Quantile(highQuantile) for _ in self.channels]
+		self.clipCounts: [int] = [0] * len(self.channels)
+		self.clipSamples: int = 0			# samples clipCounts covers, both restart when ranges are applied
+		self.samples: int = 0
+		self.appliedCount: int = 0
+
+	def observe(self, pose: DataFrame):
+		minimums = self.inputSystem.gameMinimums
+		maximums = self.inputSystem.gameMaximums
+		for i, channel in enumerate(self.channels):
+			value = getattr(pose, channel)
+			self.lowEstimators[i].add(value)
+			self.highEstimators[i].add(value)
+			if value < getattr(minimums, channel) or value > getattr(maximums, channel):
+				self.clipCounts[i] += 1
+		self.clipSamples += 1
+		self.samples += 1
+		if self.rampTo is not None:
+			self.stepRamp()
+		elif self.applyInterval and self.samples >= self.minimumSamples \
+				and self.samples % self.applyInterval == 0:
+			self.applyRanges()
+
+	def clipRates(self) -> dict:
+		if self.clipSamples == 0:
+			return {channel: 0.0 for channel in self.channels}
+		return {channel: self.clipCounts[i] / self.clipSamples for i, channel in enumerate(self.channels)}
+
+	def proposeRanges(self) -> (DataFrame, DataFrame):
+		"""
+		:return: minimum and maximum frames, channels not calibrated keep the ranges currently in use
+		"""
+		minimums = DataFrame()
+		maximums = DataFrame()
+		for attr in minimums.__dict__:
+			setattr(minimums, attr, getattr(self.inputSystem.gameMinimums, attr))
+			setattr(maximums, attr, getattr(self.inputSystem.gameMaximums, attr))
+		if self.samples < self.minimumSamples:
+			return minimums, maximums
+		for i, channel in enumerate(self.channels):
+			low = self.lowEstimators[i].value() * self.margin
+			high = self.highEstimators[i].value() * self.margin
+			if self.symmetric:
+				extent = max(abs(low), abs(high))
+				low, high = -extent, extent
+			if high > low:
+				setattr(minimums, channel, low)
+				setattr(maximums, channel, high)
+		return minimums, maximums
+
+	def applyRanges(self):
+		"""
+		Start blending the in-use ranges towards the current proposal, one step per observed sample
+		"""
+		self.rampFrom = (self.inputSystem.gameMinimums, self.inputSystem.gameMaximums)
+		self.rampTo = self.proposeRanges()
+		self.rampStep = 0
+		# Clip counts restart against the new ranges
+		self.clipCounts = [0] * len(self.channels)
+		self.clipSamples = 0
+		self.appliedCount += 1
+		self.stepRamp()
+
+	def stepRamp(self):
+		self.rampStep += 1
+		ratio = min(self.rampStep / self.rampSamples, 1.0) if self.rampSamples > 0 else 1.0
+		minimums = DataFrame()
+		maximums = DataFrame()
+		for attr in minimums.__dict__:
+			for out, start, end in ((minimums, self.rampFrom[0], self.rampTo[0]),
+					(maximums, self.rampFrom[1], self.rampTo[1])):
+				setattr(out, attr, getattr(start, attr) + (getattr(end, attr) - getattr(start, attr)) * ratio)
+		self.inputSystem.setGameRanges(minimums, maximums)
+		if ratio >= 1.0:
+			self.rampFrom = None
+			self.rampTo = None
+
+	def report(self) -> str:
+		minimums, maximums = self.proposeRanges()
+		rates = self.clipRates()
+		lines = ["Calibration over " + str(self.samples) + " samples:"]
+		for channel in self.channels:
+			lines.append(
+				f"  {channel:>6}  in use {getattr(self.inputSystem.gameMinimums, channel):+8.3f} "
+				f"{getattr(self.inputSystem.gameMaximums, channel):+8.3f}  clipped {rates[channel] * 100:6.2f}%  "
+				f"proposed {getattr(minimums, channel):+8.3f} {getattr(maximums, channel):+8.3f}"
+			)
+		return "\n".join(lines)
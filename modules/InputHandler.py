@@ -26,6 +26,7 @@ class InputHandler:
 		self.gamePlugin: GamePlugin = GamePlugin()
 		self.poseRaw: DataFrame = DataFrame()
 		self.loopDelta: float = 0
+		self.loopCount: int = 0
 		self.isIdle: bool = True
 		self.timeToIdle: float = 2.0	# Time to move from game position to idle position
 		self.timeIdlePosition: float = 0
@@ -35,6 +36,9 @@ class InputHandler:
 		self.poseNormalized: DataFrame = DataFrame()
 		self.ticker: DeltaTimer = DeltaTimer()
 		self.reporter: Reporter = Reporter(self.gamePlugin)
+		self.calibrator = None	# Optional modules.AutoCalibration.AutoCalibrator fed with every received raw pose
+		self.poseSender = None	# Optional DriverPoseUDP streaming each normalized pose to a rig controller box
+		self.publisher = None	# Optional utils.LivePublisher.LivePublisher for local tools
 		self.configureIdlePose()
 
 		# Minimums for given game
@@ -48,20 +52,30 @@ class InputHandler:
 	def setupPlugin(self):
 		self.gamePlugin.setupSocket()
 
+	def addForwardTarget(self, ip: str, port: int, maxRate: float = 0):
+		self.gamePlugin.socket.addForwardTarget(ip, port, maxRate)
+
 	def gameStatus(self):
 		return self.gamePlugin.getRunningStatus()
 
 	def gameRx(self):
 		return self.gamePlugin.getRxStatus()
 
-	def update(self):
+	def update(self, rxTimeout: float = None):
+		"""
+		:param rxTimeout: Longest time to block waiting for telemetry, keeps the wait inside the output cadence
+		"""
 		self.loopDelta = self.ticker.getDelta()
-		self.gamePlugin.update()
+		self.loopCount += 1
+		self.gamePlugin.update(rxTimeout)
 		if self.gamePlugin.getRxStatus():
 			self.poseRaw = self.gamePlugin.getDataFrame(self.loopDelta)
 		if self.telemetryDebug:
-			self.reporter.printTelemetryReport()
+			self.reporter.snapshotTelemetry()
 		self.convertRadiansToDegrees()
+		# Several updates run per telemetry frame, only sample each frame once
+		if self.calibrator is not None and self.gamePlugin.freshFrame:
+			self.calibrator.observe(self.poseRaw)
 		# Clamp to gamePlugin minmax
 		poseClamped = self.clampScales(self.poseRaw)
 		# Normalize the outputs against the game minmax values
@@ -74,7 +88,11 @@ class InputHandler:
 		else:
 			self.decayToIdlePose()
 		if self.axisOutputDebug:
-			self.reporter.printAxisOutputReport(self.poseNormalized)
+			self.reporter.snapshotPose(self.poseNormalized)
+		if self.poseSender is not None:
+			self.poseSender.sendPose(self.poseNormalized)
+		if self.publisher is not None:
+			self.publisher.publishInput(self.gamePlugin.data, self.poseNormalized)
 
 	def convertRadiansToDegrees(self):
 		self.poseRaw.pitch = self.poseRaw.pitch * (180 / math.pi)
@@ -145,3 +163,7 @@ class InputHandler:
 
 	def gameMaximumsLoad(self):
 		self.gameMaximums = self.gamePlugin.gameMaximums
+
+	def setGameRanges(self, minimums: DataFrame, maximums: DataFrame):
+		self.gameMinimums = minimums
+		self.gameMaximums = maximums
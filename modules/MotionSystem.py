@@ -23,10 +23,15 @@ class MotionSystem:
 		self.outputScaler = None
 		self.setupDefaultScaler()
 		self.axisHandlers = None
+		self.commands: [float] = [0.0] * axisCount	# Last per-axis commands as sent, kept for diagnostics
+		self.unfilteredCommands: [float] = [0.0] * axisCount	# Same before the filter bank, what gets recorded
+		self.commandCount: int = 0
 		self.initAxisHandlers(axisCount)
 		self.loadAxisInverts()
 		self.outputDriver = None
 		self.initOutputDriver(driverType)
+		self.filterBank = None
+		self.publisher = None	# Optional utils.LivePublisher.LivePublisher for local tools
 
 	def setupDefaultScaler(self):
 		# TODO: This should be loaded from somewhere probably in the gameplugin
@@ -61,6 +66,12 @@ class MotionSystem:
 		self.axisHandlers[0].inverts.sway = False
 		self.axisHandlers[1].inverts.sway = True
 
+	def loadFilterBank(self, filterBank):
+		"""
+		Smooth the per-axis commands with a utils.BiquadFilter.FilterBank, one sample per output frame
+		"""
+		self.filterBank = filterBank
+
 	def initOutputDriver(self, driverType):
 		if driverType == "SMC3":
 			self.outputDriver = DriverSMC3(self.outputScaler)
@@ -86,8 +97,16 @@ class MotionSystem:
 		# Fill the command sequence by axis
 		for i, axis in enumerate(self.axisHandlers):
 			commands[i] = axis.motionAxisOutput(self.poseHandler.outputs)
+		self.unfilteredCommands = commands
+		if self.filterBank is not None:
+			commands = self.filterBank.processCommands(commands)
+
+		self.commands = commands
+		self.commandCount += 1
 
 		# Use the output driver to generate the command string
 		out = self.outputDriver.getOutputCommand(commands, axisCount)
+		if self.publisher is not None:
+			self.publisher.publishOutput(commands, self.outputDriver.targets)
 
 		return out
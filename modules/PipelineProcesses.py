@@ -0,0 +1,101 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import sys
+import time
+import multiprocessing
+from modules.InputHandler import InputHandler
+from modules.MotionSystem import MotionSystem
+from plugins.outputs.communication.DriverSerial import DriverSerial
+from utils.SharedSeqlock import SharedPoseSlot
+from utils.RealtimeTuning import RealtimeTuning
+from utils.BiquadFilter import loadFilterBank
+
+"""
+Multiprocess pipeline. The input side (UDP, game plugin, InputHandler) and the output side (MotionSystem,
+DriverSerial) run in separate interpreters so a GC pause or console write in one cannot stall the other. The only
+link between them is a SharedPoseSlot holding the latest normalized pose.
+"""
+
+
+def runInputProcess(slotName: str, stopEvent, forwardTargets: [(str, int, float)] = ()):
+	slot = SharedPoseSlot(slotName)
+	inputSystem = InputHandler()
+	inputSystem.setupPlugin()
+	for target in forwardTargets:
+		inputSystem.addForwardTarget(*target)
+	try:
+		while not stopEvent.is_set():
+			if inputSystem.gameStatus() is True:
+				inputSystem.update()
+				slot.writePose(inputSystem.getDataFrame())
+			elif inputSystem.gameSearch():
+				print("Game found")
+			else:
+				time.sleep(1)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		slot.close()
+
+
+def runOutputProcess(slotName: str, port: str, stopEvent, updateMs: int = 10, realtime: bool = False,
+		fifoPriority: int = None, filterPath: str = None):
+	slot = SharedPoseSlot(slotName)
+	comHandler = DriverSerial(updateMs)
+	comHandler.openPort(port)
+	motionSystem = MotionSystem(2, "SMC3")
+	if filterPath:
+		motionSystem.loadFilterBank(loadFilterBank(filterPath, 1000.0 / updateMs))
+	tuning = RealtimeTuning(fifoPriority=fifoPriority) if realtime else None
+	try:
+		while not stopEvent.is_set():
+			comHandler.waitReady()
+			motionSystem.inputMotion(slot.readPose())
+			comHandler.sendCommand(motionSystem.outputCommand())
+			if tuning is not None:
+				tuning.idle(comHandler)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		slot.close()
+
+
+def runPipeline(port: str, updateMs: int = 10, realtime: bool = False, fifoPriority: int = None,
+		forwardTargets: [(str, int, float)] = (), reportInterval: float = 1.0, filterPath: str = None):
+	"""
+	Start both worker processes and report the pose handoff latency until interrupted
+	"""
+	slot = SharedPoseSlot(create=True)
+	stopEvent = multiprocessing.Event()
+	workers = [
+		multiprocessing.Process(target=runInputProcess, args=(slot.name, stopEvent, forwardTargets),
+			name="MotionInput"),
+		multiprocessing.Process(target=runOutputProcess,
+			args=(slot.name, port, stopEvent, updateMs, realtime, fifoPriority, filterPath), name="MotionOutput"),
+	]
+	for worker in workers:
+		worker.start()
+	try:
+		while all(worker.is_alive() for worker in workers):
+			time.sleep(reportInterval)
+			stats = slot.readStats()
+			sys.stdout.write(
+				f"\rhandoff latency last {stats['latencyLast'] * 1000:6.2f} ms  "
+				f"avg {stats['latencyAvg'] * 1000:6.2f} ms  max {stats['latencyMax'] * 1000:6.2f} ms  "
+				f"skipped {stats['skipped']}"
+			)
+			sys.stdout.flush()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		stopEvent.set()
+		for worker in workers:
+			worker.join()
+		slot.close()
+		slot.unlink()
@@ -13,6 +13,7 @@ from enum import Enum
 
 from utils.DataFrame import DataFrame
 from plugins.inputs.ProtocolHandlerUDP import ProtocolHandlerUDP
+from plugins.inputs.JitterBuffer import JitterBuffer
 
 # byte offset for each data field
 # e.g. timeRun is bytes 0-3, totalling 4 bytes
@@ -149,6 +150,10 @@ class GamePlugin:
 		self.datagram = None
 		self.data = DataPacketUnpacked()
 		self.socket = ProtocolHandlerUDP(self.timeout)
+		self.jitterBuffer = JitterBuffer()
+		self.freshFrame = False		# An accepted, not yet consumed datagram was parsed this update
+		self.deadReckonLimit = 0.1	# Longest gap in seconds the pose is extrapolated over before holding
+		self.missingFactor = 1.5	# Typical packet intervals without a frame before the next one counts as missing
 
 		# Derived information - Internal
 		self.VectorX = 0
@@ -157,6 +162,9 @@ class GamePlugin:
 		self.lastHeaveSpeed = 0
 		self.heaveSpeed = 0
 		self.heaveAccel = 0
+		self.lastPose = DataFrame()
+		self.poseRate = DataFrame()		# Per second change of the angles between the last two accepted frames
+		self.timeSinceFrame = 0.0
 
 		# Configured information
 		self.gameMinimums = self.loadGameMinimums()
@@ -171,15 +179,27 @@ class GamePlugin:
 	def getRxStatus(self):
 		return self.statusRxData
 
-	def update(self):
-		self.datagram = self.socket.getFrame()
+	def update(self, rxTimeout: float = None):
+		self.datagram = self.socket.getFrame(rxTimeout)
+		self.freshFrame = False
 		if self.datagram is not None:
 			self.statusRxData = True
-			self.parseDatagram()
+			# Between datagrams the socket hands back the last one, only new ones go through the jitter buffer
+			if self.socket.newFrame:
+				totalTime = struct.unpack_from('f', self.datagram, 0)[0]
+				if self.jitterBuffer.classify(totalTime) == JitterBuffer.ACCEPTED:
+					self.parseDatagram()
+					self.freshFrame = True
 		else:
+			if self.statusRxData:
+				self.jitterBuffer.timeouts += 1
+				self.jitterBuffer.reset()
 			self.statusRxData = False
+		self.socket.forwardFrame()
 
 	def getDataFrame(self, frameDelta) -> DataFrame:
+		if self.datagram is not None and not self.freshFrame:
+			return self.deadReckonFrame(frameDelta)
 		dataFrame = DataFrame()
 		if self.datagram is not None:
 			# Calculate pitch/yaw/roll angles in radians
@@ -195,10 +215,13 @@ class GamePlugin:
 			self.heaveSpeed = (self.VectorX * self.data.velocityX) + \
 								(self.VectorY * self.data.velocityY) + \
 								(self.VectorZ * self.data.velocityZ)
-			self.heaveAccel = (self.heaveSpeed - self.lastHeaveSpeed) / frameDelta
+			# Differentiate over game time when known so uneven packet arrival does not show up as heave
+			packetDelta = self.jitterBuffer.packetDelta
+			self.heaveAccel = (self.heaveSpeed - self.lastHeaveSpeed) / (packetDelta if packetDelta > 0 else frameDelta)
 			self.lastHeaveSpeed = self.heaveSpeed
 
 			dataFrame.heave = self.heaveAccel
+			self.updatePoseRate(dataFrame, packetDelta)
 		else:
 			dataFrame.pitch = 0
 			dataFrame.roll = 0
@@ -209,6 +232,42 @@ class GamePlugin:
 
 		return dataFrame
 
+	def updatePoseRate(self, dataFrame: DataFrame, packetDelta: float):
+		rate = DataFrame()
+		if packetDelta > 0:
+			rate.pitch = (dataFrame.pitch - self.lastPose.pitch) / packetDelta
+			rate.roll = (dataFrame.roll - self.lastPose.roll) / packetDelta
+			# Yaw wraps at +-pi, take the short way round
+			rate.yaw = ((dataFrame.yaw - self.lastPose.yaw + math.pi) % (2 * math.pi) - math.pi) / packetDelta
+		self.poseRate = rate
+		# Copy, the caller converts the returned frame in place
+		self.lastPose = DataFrame()
+		self.lastPose.__dict__.update(dataFrame.__dict__)
+		self.timeSinceFrame = 0.0
+
+	def deadReckonFrame(self, frameDelta: float) -> DataFrame:
+		"""
+		No new frame this update. The last pose is held while the next frame is still due, once it is missing the
+		angles are carried on from there along their rate for up to deadReckonLimit, then held again. Surge, sway
+		and heave are accelerations already and always held, extrapolating along their noisy derivatives only adds
+		buzz. Real timeouts are left to the idle decay in InputHandler.
+		"""
+		self.timeSinceFrame += frameDelta
+		dataFrame = DataFrame()
+		dataFrame.__dict__.update(self.lastPose.__dict__)
+		missingAfter = self.jitterBuffer.packetInterval * self.missingFactor
+		if missingAfter <= 0 or self.timeSinceFrame <= missingAfter:
+			return dataFrame
+		elapsed = self.timeSinceFrame - missingAfter
+		if elapsed > self.deadReckonLimit:
+			elapsed = self.deadReckonLimit
+		else:
+			self.jitterBuffer.deadReckoned += 1
+		dataFrame.pitch = self.lastPose.pitch + self.poseRate.pitch * elapsed
+		dataFrame.roll = self.lastPose.roll + self.poseRate.roll * elapsed
+		dataFrame.yaw = self.lastPose.yaw + self.poseRate.yaw * elapsed
+		return dataFrame
+
 	def parseDatagram(self):
 		self.datagram = struct.unpack(str(numDataFieldsInPacket) + 'f',
 									self.datagram[
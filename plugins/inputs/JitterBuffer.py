@@ -0,0 +1,84 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+JitterBuffer screens incoming game frames by their own timestamp (totalTime) before they reach the parser. Frames
+with the same timestamp as the last accepted one are duplicates, frames older than it arrived out of order and are
+dropped as stale. A jump back is only taken as a restarted stage when it is corroborated, either by landing near
+zero game time or by the next frame carrying on from it; a single very late packet is still stale. Forward jumps
+well beyond the usual packet interval are counted as gaps.
+"""
+class JitterBuffer:
+	ACCEPTED = 0
+	DUPLICATE = 1
+	STALE = 2
+
+	def __init__(self, staleIntervals: float = 4.0, gapFactor: float = 2.5, defaultInterval: float = 1 / 60,
+			restartTime: float = 0.5):
+		self.staleIntervals = staleIntervals	# late frames up to this many typical intervals back are always stale
+		self.gapFactor = gapFactor				# intervals longer than this many typical intervals are gaps
+		self.defaultInterval = defaultInterval	# seconds, stands in for packetInterval until it is measured
+		self.restartTime = restartTime			# seconds, a jump back to below this game time is a restart outright
+		self.lastTime = None
+		self.candidateTime = None				# Earlier timeline a further jump back landed on, pending a second frame
+		self.packetInterval: float = 0.0		# smoothed game time between accepted frames
+		self.packetDelta: float = 0.0			# game time between the last two accepted frames, 0 after a reset
+
+		# Counters
+		self.accepted: int = 0
+		self.duplicates: int = 0
+		self.stale: int = 0
+		self.gaps: int = 0
+		self.resets: int = 0
+		self.deadReckoned: int = 0
+		self.timeouts: int = 0
+
+	def reset(self):
+		self.lastTime = None
+		self.candidateTime = None
+		self.packetDelta = 0.0
+
+	def typicalInterval(self) -> float:
+		return self.packetInterval or self.defaultInterval
+
+	def classify(self, totalTime: float) -> int:
+		if self.lastTime is None:
+			return self.acceptFrame(totalTime, 0.0)
+		delta = totalTime - self.lastTime
+		if delta == 0:
+			self.duplicates += 1
+			return self.DUPLICATE
+		if delta < 0:
+			if -delta > self.staleIntervals * self.typicalInterval():
+				if totalTime < self.restartTime:
+					return self.restart(totalTime, 0.0)
+				if self.candidateTime is not None:
+					candidateDelta = totalTime - self.candidateTime
+					if 0 < candidateDelta <= self.gapFactor * self.typicalInterval():
+						# Second frame carrying on from the earlier one, the game really went back
+						return self.restart(totalTime, candidateDelta)
+				self.candidateTime = totalTime
+			self.stale += 1
+			return self.STALE
+		self.candidateTime = None
+		if self.packetInterval > 0 and delta > self.packetInterval * self.gapFactor:
+			self.gaps += 1
+		else:
+			self.packetInterval = delta if self.packetInterval == 0 else self.packetInterval * 0.9 + delta * 0.1
+		return self.acceptFrame(totalTime, delta)
+
+	def restart(self, totalTime: float, delta: float) -> int:
+		self.resets += 1
+		self.candidateTime = None
+		return self.acceptFrame(totalTime, delta)
+
+	def acceptFrame(self, totalTime: float, delta: float) -> int:
+		self.lastTime = totalTime
+		self.packetDelta = delta
+		self.accepted += 1
+		return self.ACCEPTED
@@ -0,0 +1,131 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import socket
+import time
+from utils.DataFrame import DataFrame
+from utils.PoseProtocol import unpackPose
+
+
+class ProtocolHandlerPoseUDP:
+	"""
+	Receives poses sent by DriverPoseUDP for MotionSystem.inputMotion. Each getPose() drains everything queued on
+	the socket and keeps only the newest pose, older or repeated sequence numbers are dropped. When the sender goes
+	quiet for timeout seconds the pose decays to neutral over timeToIdle, as InputHandler does on telemetry loss, so
+	a crashed gaming PC or dropped link does not leave the rig tilted.
+	One-way latency compares the sender's wall clock with ours, across hosts it is only as good as their clock sync.
+	"""
+	def __init__(self, timeout: float = 1.0, timeToIdle: float = 2.0):
+		self.timeout = timeout
+		self.timeToIdle = timeToIdle
+		self.socket = None
+		self.buffer = bytearray(64)
+		self.pose = DataFrame()
+		self.lastSequence = None
+		self.lastPacket: float = 0.0
+		self.lastSentNs: int = 0
+		self.decayStart = None			# Pose held when the sender went quiet, None while poses arrive
+		self.decayStartTime: float = 0.0
+
+		# Stats
+		self.receivedCount: int = 0
+		self.lostCount: int = 0
+		self.outOfOrderCount: int = 0
+		self.invalidCount: int = 0
+		self.timeoutCount: int = 0
+		self.resetLatencyWindow()
+
+	def resetLatencyWindow(self):
+		self.latencyCount: int = 0
+		self.latencyTotal: int = 0			# ns
+		self.latencyMin: int = 0
+		self.latencyMax: int = 0
+
+	def openUDP(self, ip: str, port: int):
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.setblocking(False)
+		self.socket.bind((ip, port))
+
+	def closeUDP(self):
+		self.socket.close()
+
+	def getPose(self) -> DataFrame:
+		"""
+		:return: newest pose received, decaying to neutral once the sender has gone quiet
+		"""
+		while True:
+			try:
+				size = self.socket.recv_into(self.buffer)
+			except (BlockingIOError, InterruptedError):
+				break
+			self.receiveDatagram(memoryview(self.buffer)[:size])
+		if self.lastPacket and time.time() - self.lastPacket > self.timeout:
+			# Sender quiet, count it once and start easing back to neutral
+			self.timeoutCount += 1
+			self.lastPacket = 0.0
+			self.lastSequence = None
+			self.decayStart = self.pose
+			self.decayStartTime = time.time()
+		if self.decayStart is not None:
+			self.decayToIdlePose()
+		return self.pose
+
+	def decayToIdlePose(self):
+		idleRatio = min((time.time() - self.decayStartTime) / self.timeToIdle, 1.0) if self.timeToIdle > 0 else 1.0
+		out = DataFrame()
+		for axis, value in self.decayStart.__dict__.items():
+			setattr(out, axis, value * (1.0 - idleRatio))
+		self.pose = out
+
+	def receiveDatagram(self, datagram):
+		received = time.time_ns()
+		unpacked = unpackPose(datagram)
+		if unpacked is None:
+			self.invalidCount += 1
+			return
+		sequence, sentNs, pose = unpacked
+		if self.lastSequence is not None:
+			step = (sequence - self.lastSequence) & 0xFFFFFFFF
+			if step == 0 or step > 0x80000000:
+				# An older sequence sent later than the last pose means the sender restarted its count
+				if sentNs <= self.lastSentNs:
+					self.outOfOrderCount += 1
+					return
+			elif step > 1:
+				self.lostCount += step - 1
+		self.lastSequence = sequence
+		self.lastSentNs = sentNs
+		self.lastPacket = time.time()
+		self.receivedCount += 1
+		self.pose = pose
+		self.decayStart = None
+
+		latency = received - sentNs
+		if self.latencyCount == 0 or latency < self.latencyMin:
+			self.latencyMin = latency
+		if latency > self.latencyMax:
+			self.latencyMax = latency
+		self.latencyTotal += latency
+		self.latencyCount += 1
+
+	def statsLine(self) -> str:
+		"""
+		One line summary, the latency window restarts after each call
+		"""
+		lossBase = self.receivedCount + self.lostCount
+		line = (
+			f"poses {self.receivedCount}  lost {self.lostCount} ({self.lostCount / lossBase * 100 if lossBase else 0:.2f}%)"
+			f"  out of order {self.outOfOrderCount}  timeouts {self.timeoutCount}"
+		)
+		if self.latencyCount:
+			line += (
+				f"  latency min {self.latencyMin / 1000000:.2f} avg {self.latencyTotal / self.latencyCount / 1000000:.2f}"
+				f" max {self.latencyMax / 1000000:.2f} ms"
+			)
+		self.resetLatencyWindow()
+		return line
@@ -6,10 +6,20 @@
 #
 # THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import math
 import socket
 import time
 
 
+class ForwardTarget:
+	def __init__(self, ip: str, port: int, maxRate: float):
+		self.address = (ip, port)
+		self.minInterval: int = int(1000000000 / maxRate) if maxRate > 0 else 0	# ns, 0 forwards every datagram
+		self.lastSent: int = 0
+		self.sentCount: int = 0
+		self.droppedCount: int = 0
+
+
 class ProtocolHandlerUDP:
 	def __init__(self, timeout: float):
 		self.timeout = timeout
@@ -19,6 +29,19 @@ class ProtocolHandlerUDP:
 		self.lastPacket = 0.0
 		self.data = None
 
+		# Datagrams land in one preallocated buffer, data is a view into it rather than a fresh bytes object
+		self.buffer = bytearray(1024)
+		self.bufferView = memoryview(self.buffer)
+		self.newFrame: bool = False
+
+		# Downstream consumers every received datagram is re-sent to
+		self.forwardTargets: [ForwardTarget] = []
+		self.forwardSocket = None
+
+		# Health counters, read by the metrics exporter
+		self.packetCount: int = 0
+		self.timeoutCount: int = 0
+
 	def openUDP(self, game_ip, game_port):
 		# self.socket = networking.open_port(game_ip, game_port)
 		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -30,18 +53,63 @@ class ProtocolHandlerUDP:
 
 	def closeUDP(self):
 		self.socket.close()
+		if self.forwardSocket is not None:
+			self.forwardSocket.close()
+			self.forwardSocket = None
+
+	def addForwardTarget(self, ip: str, port: int, maxRate: float = 0):
+		"""
+		Re-send each received datagram to ip:port, at most maxRate times per second (0 for every datagram)
+		"""
+		if self.forwardSocket is None:
+			# Separate non-blocking socket so a slow consumer can never hold up the receive side
+			self.forwardSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+			self.forwardSocket.setblocking(False)
+		self.forwardTargets.append(ForwardTarget(ip, port, maxRate))
 
-	def getFrame(self):
+	def getFrame(self, timeout: float = None):
+		"""
+		:param timeout: Seconds to wait for a datagram, kept as the socket timeout for later calls. Under a
+			millisecond polls without blocking.
+		"""
 		if self.socket is None:
 			return None
+		if timeout is not None:
+			# Socket waits are rounded up to whole milliseconds, round down so the caller's bound holds
+			self.socket.settimeout(max(math.floor(timeout * 1000) / 1000, 0.0))
 		if self.socket.recv is not None:
 			try:
-				self.data, addr = self.socket.recvfrom(1024)  # 1024 byte buffer
+				size, addr = self.socket.recvfrom_into(self.buffer)  # 1024 byte buffer
+				self.data = self.bufferView[:size]
+				self.newFrame = True
 				self.lastPacket = time.time()
-			except TimeoutError as _:
+				self.packetCount += 1
+			except (TimeoutError, BlockingIOError) as _:
 				if (time.time() - self.lastPacket >= self.timeout) and (self.data is not None):
 					print(str(self.timeout) + ' seconds since last packet, clearing data buffer and marking inactive')
 					self.data = None
+					self.timeoutCount += 1
 				else:
 					pass
 		return self.data
+
+	def forwardFrame(self):
+		"""
+		Send the last received datagram on to the forward targets. Called after the frame has been handed to the
+		parser so forwarding never delays motion, and sends straight from the receive buffer without a copy.
+		"""
+		if not self.newFrame:
+			return
+		self.newFrame = False
+		if not self.forwardTargets:
+			return
+		now = time.perf_counter_ns()
+		for target in self.forwardTargets:
+			if now - target.lastSent >= target.minInterval:
+				try:
+					self.forwardSocket.sendto(self.data, target.address)
+					target.lastSent = now
+					target.sentCount += 1
+				except OSError:
+					# Full send buffer or nobody listening, drop rather than wait
+					target.droppedCount += 1
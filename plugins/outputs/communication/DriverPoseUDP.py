@@ -0,0 +1,37 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import socket
+import time
+from utils.DataFrame import DataFrame
+from utils.PoseProtocol import packPose
+
+
+class DriverPoseUDP:
+	"""
+	Sends the normalized pose from InputHandler to a rig controller box running ProtocolHandlerPoseUDP
+	"""
+	def __init__(self, ip: str, port: int):
+		self.address = (ip, port)
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.setblocking(False)
+		self.sequence: int = 0
+		self.sentCount: int = 0
+		self.droppedCount: int = 0
+
+	def sendPose(self, pose: DataFrame):
+		self.sequence += 1
+		try:
+			self.socket.sendto(packPose(self.sequence, time.time_ns(), pose), self.address)
+			self.sentCount += 1
+		except OSError:
+			# Never wait on the network, the next pose supersedes this one anyway
+			self.droppedCount += 1
+
+	def close(self):
+		self.socket.close()
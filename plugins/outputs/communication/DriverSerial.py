@@ -13,20 +13,33 @@ from plugins.outputs.communication.DriverSerialComfinder import SerialFinder
 
 
 class DriverSerial:
-	def __init__(self):
-		self.updateMs: int = 10
+	def __init__(self, updateMs: float = 10):
+		self.updateMs: float = updateMs
 		self.port = None
 		self.baud = 500000
-		self.timer = TickTimer(self.updateMs)	# 10ms = 100Hz updates
+		self.timer = TickTimer(self.updateMs)	# 10ms = 100Hz updates, 4ms = 250Hz
 		self.connection = None
 		self.ready = True
 		self.finder = SerialFinder()
 
+		# Health counters, read by the metrics exporter
+		self.writeCount: int = 0
+		self.writeErrorCount: int = 0
+		self.writeTimeTotal: int = 0	# ns
+		self.writeTimeMax: int = 0		# ns
+		self.reconnectCount: int = 0
+		self.tickJitter = self.timer.jitter
+
 	def selectSerial(self):
 		self.port = self.finder.listPorts()
 		if self.port is not None:
 			self.initSerial()
 
+	def openPort(self, port: str):
+		# Bypass the interactive finder, e.g. for a known device path or the SMC3 simulator pty
+		self.port = port
+		self.initSerial()
+
 	def initSerial(self):
 		try:
 			self.connection = serial.Serial(self.port, self.baud, timeout=1)
@@ -42,24 +55,47 @@ class DriverSerial:
 		else:
 			return False
 
+	def waitReady(self):
+		# Blocking alternative to polling isReady() for loops with nothing else to do
+		self.timer.wait()
+		self.ready = True
+
+	def resetTimer(self):
+		# After a pause in polling, e.g. a game search, restart the frame grid from now
+		self.timer.reset()
+
+	def timeUntilReady(self) -> float:
+		# Seconds other blocking calls in the loop can take before isReady() needs polling again
+		return self.timer.timeUntilSpin()
+
 	def sendCommand(self, command):
 		if self.ready is True:
 			self.ready = False
 			if self.connection:
 				if self.connection.in_waiting > 0:
-					serial_out = self.connection.read_until()
+					# Only take what has already arrived, read_until() blocks for the full timeout on unterminated
+					# SMC3 feedback frames
+					serial_out = self.connection.read(self.connection.in_waiting)
 					print(serial_out)
 			if self.connection:
 				if not self.connection.is_open:
 					self.initSerial()
 				if self.connection.is_open:
 					try:
+						writeStart = time.perf_counter_ns()
 						self.connection.write(command)
+						writeTime = time.perf_counter_ns() - writeStart
+						self.writeCount += 1
+						self.writeTimeTotal += writeTime
+						if writeTime > self.writeTimeMax:
+							self.writeTimeMax = writeTime
 					except Exception as err:
 						self.connection.close()
 						self.connection = None
+						self.writeErrorCount += 1
 						print(err)
 			else:
 				print('Retrying port ' + str(self.port) + ' at ' + str(self.baud) + ' baud')
 				time.sleep(.25)
+				self.reconnectCount += 1
 				self.initSerial()
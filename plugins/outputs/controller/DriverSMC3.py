@@ -17,6 +17,8 @@ class DriverSMC3:
 		self.bitDepth = 10
 		self.frameTime = 10  # ms
 		self.axisNames = ["A", "B", "C"]
+		self.clipCounts: [int] = [0] * len(self.axisNames)	# Frames each axis was clamped to the driver range
+		self.targets: [int] = []	# Last positions sent to the controller, in driver units
 
 		# Data that needs to be fed from the AxisHandlers
 		self.outputScaler = outputScaler
@@ -35,7 +37,10 @@ class DriverSMC3:
 		denormalizedCommandFrame: [float] = [0.0] * axisCount
 		for i in range(axisCount):
 			denormalizedCommandFrame[i] = remapValue(commandFrames[i], -1.0, 1.0, self.driverMin, self.driverMax)
+			if denormalizedCommandFrame[i] > self.driverMax or denormalizedCommandFrame[i] < self.driverMin:
+				self.clipCounts[i] += 1
 			denormalizedCommandFrame[i] = self.clampValue(denormalizedCommandFrame[i])
+		self.targets = [int(value) for value in denormalizedCommandFrame]
 		commandString = self.formatSums(denormalizedCommandFrame, axisCount)
 		return commandString
 
@@ -0,0 +1,140 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+from plugins.games.DirtRally2 import GamePlugin
+from plugins.inputs.JitterBuffer import JitterBuffer
+
+"""
+JitterBuffer classification of game timestamps and GamePlugin's hold-then-extrapolate between frames.
+
+	python -m unittest discover tests
+"""
+
+interval = 1 / 60
+
+
+def feed(jitterBuffer: JitterBuffer, first: int, last: int):
+	# Accept frames first..last-1 of a 60 Hz stream
+	for frame in range(first, last):
+		jitterBuffer.classify(frame * interval)
+
+
+class TestJitterBuffer(unittest.TestCase):
+	def setUp(self):
+		self.jitterBuffer = JitterBuffer()
+		feed(self.jitterBuffer, 0, 100)
+
+	def testInOrder(self):
+		self.assertEqual(self.jitterBuffer.accepted, 100)
+		self.assertAlmostEqual(self.jitterBuffer.packetInterval, interval)
+		self.assertAlmostEqual(self.jitterBuffer.packetDelta, interval)
+
+	def testDuplicate(self):
+		self.assertEqual(self.jitterBuffer.classify(99 * interval), JitterBuffer.DUPLICATE)
+		self.assertEqual(self.jitterBuffer.duplicates, 1)
+		self.assertAlmostEqual(self.jitterBuffer.lastTime, 99 * interval)
+
+	def testStale(self):
+		self.assertEqual(self.jitterBuffer.classify(97 * interval), JitterBuffer.STALE)
+		self.assertEqual(self.jitterBuffer.classify(100 * interval), JitterBuffer.ACCEPTED)
+		self.assertEqual(self.jitterBuffer.stale, 1)
+		self.assertEqual(self.jitterBuffer.resets, 0)
+
+	def testVeryLatePacketIsStale(self):
+		# Beyond the stale window but not corroborated, the pose must not rewind
+		self.assertEqual(self.jitterBuffer.classify(94 * interval), JitterBuffer.STALE)
+		self.assertEqual(self.jitterBuffer.classify(100 * interval), JitterBuffer.ACCEPTED)
+		self.assertEqual(self.jitterBuffer.resets, 0)
+		self.assertEqual(self.jitterBuffer.gaps, 0)
+		self.assertAlmostEqual(self.jitterBuffer.packetDelta, interval)
+
+	def testRestartNearZero(self):
+		jitterBuffer = JitterBuffer()
+		jitterBuffer.classify(1.11)
+		self.assertEqual(jitterBuffer.classify(0.0), JitterBuffer.ACCEPTED)
+		self.assertEqual(jitterBuffer.classify(0.01), JitterBuffer.ACCEPTED)
+		self.assertEqual(jitterBuffer.resets, 1)
+		self.assertEqual(jitterBuffer.stale, 0)
+
+	def testRestartCorroboratedBySecondFrame(self):
+		feed(self.jitterBuffer, 6000, 6010)
+		self.assertEqual(self.jitterBuffer.classify(40.0), JitterBuffer.STALE)
+		self.assertEqual(self.jitterBuffer.classify(40.0 + interval), JitterBuffer.ACCEPTED)
+		self.assertEqual(self.jitterBuffer.resets, 1)
+		self.assertAlmostEqual(self.jitterBuffer.packetDelta, interval)
+		self.assertEqual(self.jitterBuffer.classify(40.0 + 2 * interval), JitterBuffer.ACCEPTED)
+
+	def testGap(self):
+		self.assertEqual(self.jitterBuffer.classify(105 * interval), JitterBuffer.ACCEPTED)
+		self.assertEqual(self.jitterBuffer.gaps, 1)
+		# A gap does not skew the typical interval
+		self.assertAlmostEqual(self.jitterBuffer.packetInterval, interval)
+		self.assertAlmostEqual(self.jitterBuffer.packetDelta, 6 * interval)
+
+	def testReset(self):
+		self.jitterBuffer.reset()
+		self.assertEqual(self.jitterBuffer.classify(10 * interval), JitterBuffer.ACCEPTED)
+		self.assertEqual(self.jitterBuffer.packetDelta, 0.0)
+
+
+class TestDeadReckoning(unittest.TestCase):
+	def setUp(self):
+		self.gamePlugin = GamePlugin()
+		feed(self.gamePlugin.jitterBuffer, 0, 100)
+		pose = self.gamePlugin.lastPose
+		pose.pitch, pose.roll, pose.yaw = 0.1, -0.2, 3.0
+		pose.surge, pose.sway, pose.heave = 0.5, -0.5, 2.0
+		rate = self.gamePlugin.poseRate
+		rate.pitch, rate.roll, rate.yaw = 1.0, -1.0, 2.0
+
+	def advance(self, seconds: float):
+		return self.gamePlugin.deadReckonFrame(seconds)
+
+	def testHoldsWhileNextFrameIsDue(self):
+		for i in range(2):
+			frame = self.advance(0.01)
+			self.assertEqual(frame.__dict__, self.gamePlugin.lastPose.__dict__)
+		self.assertEqual(self.gamePlugin.jitterBuffer.deadReckoned, 0)
+
+	def testExtrapolatesAnglesOnceMissing(self):
+		missingAfter = self.gamePlugin.jitterBuffer.packetInterval * self.gamePlugin.missingFactor
+		self.advance(missingAfter)
+		frame = self.advance(0.02)
+		self.assertAlmostEqual(frame.pitch, 0.1 + 0.02)
+		self.assertAlmostEqual(frame.roll, -0.2 - 0.02)
+		self.assertAlmostEqual(frame.yaw, 3.0 + 0.04)
+		# Accelerations are held, never extrapolated
+		self.assertEqual((frame.surge, frame.sway, frame.heave), (0.5, -0.5, 2.0))
+		self.assertEqual(self.gamePlugin.jitterBuffer.deadReckoned, 1)
+
+	def testLimitCapsExtrapolation(self):
+		missingAfter = self.gamePlugin.jitterBuffer.packetInterval * self.gamePlugin.missingFactor
+		limit = self.gamePlugin.deadReckonLimit
+		self.advance(missingAfter + limit / 2)
+		frame = self.advance(limit)
+		self.assertAlmostEqual(frame.pitch, 0.1 + limit)
+		self.assertEqual(self.gamePlugin.jitterBuffer.deadReckoned, 1)
+		frame = self.advance(1.0)
+		self.assertAlmostEqual(frame.pitch, 0.1 + limit)
+		self.assertEqual(self.gamePlugin.jitterBuffer.deadReckoned, 1)
+
+	def testHoldsWithoutIntervalEstimate(self):
+		self.gamePlugin.jitterBuffer.packetInterval = 0.0
+		frame = self.advance(0.5)
+		self.assertEqual(frame.pitch, 0.1)
+		self.assertEqual(self.gamePlugin.jitterBuffer.deadReckoned, 0)
+
+	def testFreshFrameRestartsHold(self):
+		self.advance(0.1)
+		self.gamePlugin.updatePoseRate(self.gamePlugin.lastPose, interval)
+		self.assertEqual(self.gamePlugin.timeSinceFrame, 0.0)
+		self.assertEqual(self.advance(0.01).pitch, 0.1)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,159 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import socket
+import time
+import unittest
+from plugins.inputs.ProtocolHandlerPoseUDP import ProtocolHandlerPoseUDP
+from plugins.outputs.communication.DriverPoseUDP import DriverPoseUDP
+from utils.DataFrame import DataFrame
+from utils.PoseProtocol import packPose, poseFormat
+
+"""
+Split-host pose stream over loopback: DriverPoseUDP and hand-built datagrams into ProtocolHandlerPoseUDP.
+
+	python -m unittest discover tests
+"""
+
+
+def makePose(value: float) -> DataFrame:
+	pose = DataFrame()
+	pose.pitch = value
+	pose.roll = -value
+	pose.yaw = 0.0
+	pose.surge = value / 2
+	pose.sway = -value / 2
+	pose.heave = 0.25
+	return pose
+
+
+class TestPoseUDP(unittest.TestCase):
+	def setUp(self):
+		self.receiver = ProtocolHandlerPoseUDP()
+		self.receiver.openUDP("127.0.0.1", 0)
+		self.address = self.receiver.socket.getsockname()
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+	def tearDown(self):
+		self.socket.close()
+		self.receiver.closeUDP()
+
+	def sendRaw(self, sequence: int, pose: DataFrame, sentNs: int = None):
+		self.socket.sendto(packPose(sequence, sentNs or time.time_ns(), pose), self.address)
+
+	def drain(self, datagrams: int) -> DataFrame:
+		# Poll until every datagram sent so far has been handled one way or another
+		end = time.time() + 1.0
+		pose = self.receiver.getPose()
+		while time.time() < end:
+			handled = self.receiver.receivedCount + self.receiver.outOfOrderCount + self.receiver.invalidCount
+			if handled >= datagrams:
+				break
+			time.sleep(0.001)
+			pose = self.receiver.getPose()
+		return pose
+
+	def assertPose(self, pose: DataFrame, value: float):
+		for axis, expected in makePose(value).__dict__.items():
+			self.assertAlmostEqual(getattr(pose, axis), expected, places=5)
+
+	def testDelivery(self):
+		sender = DriverPoseUDP(*self.address)
+		for i in range(10):
+			sender.sendPose(makePose(i / 10))
+		pose = self.drain(10)
+		sender.close()
+		self.assertEqual(self.receiver.receivedCount, 10)
+		self.assertEqual(self.receiver.lostCount, 0)
+		self.assertPose(pose, 0.9)
+		self.assertEqual(poseFormat.size, 40)
+		self.assertIn("latency", self.receiver.statsLine())
+
+	def testLoss(self):
+		for sequence in (1, 2, 5, 6, 10):
+			self.sendRaw(sequence, makePose(sequence / 10))
+		pose = self.drain(5)
+		self.assertEqual(self.receiver.receivedCount, 5)
+		self.assertEqual(self.receiver.lostCount, 5)
+		self.assertPose(pose, 1.0)
+
+	def testOutOfOrder(self):
+		sentNs = time.time_ns()
+		self.sendRaw(1, makePose(0.1), sentNs)
+		self.sendRaw(3, makePose(0.3), sentNs + 2000000)
+		self.sendRaw(2, makePose(0.2), sentNs + 1000000)
+		self.sendRaw(3, makePose(0.3), sentNs + 2000000)
+		pose = self.drain(4)
+		self.assertEqual(self.receiver.receivedCount, 2)
+		self.assertEqual(self.receiver.outOfOrderCount, 2)
+		self.assertEqual(self.receiver.lostCount, 1)
+		self.assertPose(pose, 0.3)
+
+	def testSenderRestart(self):
+		for i in range(5):
+			self.sendRaw(100 + i, makePose(0.5))
+		self.drain(5)
+		# A restarted sender counts from 1 again but its poses are newer
+		sender = DriverPoseUDP(*self.address)
+		sender.sendPose(makePose(-0.5))
+		sender.sendPose(makePose(-0.25))
+		pose = self.drain(7)
+		sender.close()
+		self.assertEqual(self.receiver.receivedCount, 7)
+		self.assertEqual(self.receiver.outOfOrderCount, 0)
+		self.assertEqual(self.receiver.lostCount, 0)
+		self.assertPose(pose, -0.25)
+
+	def testSequenceWrap(self):
+		self.sendRaw(0xFFFFFFFF, makePose(0.1))
+		self.sendRaw(0x100000000, makePose(0.2))
+		pose = self.drain(2)
+		self.assertEqual(self.receiver.receivedCount, 2)
+		self.assertEqual(self.receiver.lostCount, 0)
+		self.assertPose(pose, 0.2)
+
+	def testInvalidDatagrams(self):
+		self.sendRaw(1, makePose(0.4))
+		valid = packPose(2, time.time_ns(), makePose(0.8))
+		self.socket.sendto(b"", self.address)
+		self.socket.sendto(valid[:-1], self.address)
+		self.socket.sendto(valid + b"\x00", self.address)
+		self.socket.sendto(b"\x00\x00" + valid[2:], self.address)
+		self.socket.sendto(valid[:2] + b"\x09\x00" + valid[4:], self.address)
+		self.socket.sendto(bytes(264), self.address)
+		pose = self.drain(7)
+		self.assertEqual(self.receiver.invalidCount, 6)
+		self.assertEqual(self.receiver.receivedCount, 1)
+		self.assertPose(pose, 0.4)
+
+	def testTimeoutDecaysToNeutral(self):
+		self.receiver.timeout = 0.05
+		self.receiver.timeToIdle = 0.4
+		self.sendRaw(7, makePose(0.6))
+		self.drain(1)
+		time.sleep(0.1)
+		pose = self.receiver.getPose()
+		self.assertEqual(self.receiver.timeoutCount, 1)
+		# Decay starts from the last pose when the timeout is noticed
+		self.assertAlmostEqual(pose.pitch, 0.6, delta=0.02)
+		time.sleep(0.2)
+		pose = self.receiver.getPose()
+		self.assertLess(pose.pitch, 0.6 * 0.6)
+		self.assertGreater(pose.pitch, 0.0)
+		time.sleep(0.25)
+		pose = self.receiver.getPose()
+		for axis, value in pose.__dict__.items():
+			self.assertEqual(value, 0.0, axis)
+		self.assertEqual(self.receiver.timeoutCount, 1)
+		# After a timeout any sequence starts a fresh stream
+		self.sendRaw(1, makePose(0.7))
+		self.assertPose(self.drain(2), 0.7)
+		self.assertPose(self.receiver.getPose(), 0.7)
+
+
+if __name__ == "__main__":
+	unittest.main()
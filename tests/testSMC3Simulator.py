@@ -0,0 +1,85 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import time
+import unittest
+from plugins.outputs.communication.DriverSerial import DriverSerial
+from plugins.outputs.controller.DriverSMC3 import DriverSMC3
+from tools.SMC3Simulator import SMC3Simulator
+from utils.DataFrame import DataFrame
+
+"""
+Closed-loop round trip of DriverSerial against the SMC3 simulator pty, no hardware needed.
+
+	python -m unittest discover tests
+"""
+
+
+class TestSMC3Simulator(unittest.TestCase):
+	def setUp(self):
+		self.simulator = SMC3Simulator()
+		self.comHandler = DriverSerial(10)
+		self.comHandler.openPort(self.simulator.start())
+		self.driver = DriverSMC3(DataFrame())
+
+	def tearDown(self):
+		self.comHandler.connection.close()
+		self.simulator.stop()
+
+	def sendFrames(self, commands: [float], count: int) -> bytes:
+		message = self.driver.getOutputCommand(commands, 2)
+		for i in range(count):
+			self.comHandler.waitReady()
+			self.comHandler.sendCommand(message)
+		return message
+
+	def waitForFrames(self, count: int, timeout: float = 1.0):
+		end = time.time() + timeout
+		while self.simulator.getStats()["frames"] < count and time.time() < end:
+			time.sleep(0.01)
+
+	def testRoundTrip(self):
+		self.sendFrames([0.5, -0.5], 50)
+		self.waitForFrames(50)
+		# Let the modelled actuators finish the move
+		time.sleep(0.3)
+		stats = self.simulator.getStats()
+		self.assertEqual(stats["frames"], 50)
+		self.assertEqual(stats["badBytes"], 0)
+		self.assertEqual(self.comHandler.writeCount, 50)
+		self.assertEqual(self.comHandler.writeErrorCount, 0)
+		self.assertAlmostEqual(stats["commandRateHz"], 100.0, delta=20.0)
+		self.assertEqual([int(actuator.target) for actuator in self.simulator.actuators], self.driver.targets)
+		for position, target in zip(stats["positions"], self.driver.targets):
+			self.assertLessEqual(abs(position - target), self.simulator.settleTolerance)
+		self.assertGreater(stats["latencySamples"], 0)
+
+	def testFeedback(self):
+		self.comHandler.connection.write(b"[mo1]")
+		self.sendFrames([0.0, 1.0], 1)
+		self.waitForFrames(1)
+		feedback = self.comHandler.connection.read(10)
+		self.assertTrue(self.simulator.monitor)
+		self.assertEqual(len(feedback), 10)
+		for i, (name, target) in enumerate(zip("AB", self.driver.targets)):
+			frame = feedback[i * 5:i * 5 + 5]
+			self.assertEqual(frame[0:2], b"[" + name.encode())
+			self.assertEqual(frame[3], target >> 2)
+			self.assertEqual(frame[4:5], b"]")
+
+	def testResynchronizesAfterGarbage(self):
+		self.comHandler.connection.write(b"\x00]]x")
+		self.sendFrames([0.25, 0.25], 2)
+		self.waitForFrames(2)
+		stats = self.simulator.getStats()
+		self.assertEqual(stats["frames"], 2)
+		self.assertEqual(stats["badBytes"], 4)
+		self.assertEqual([int(actuator.target) for actuator in self.simulator.actuators], self.driver.targets)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,130 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import math
+import multiprocessing
+import socket
+import struct
+import time
+import unittest
+from modules.InputHandler import InputHandler
+from modules.MotionSystem import MotionSystem
+from plugins.outputs.communication.DriverSerial import DriverSerial
+from tools.SoakTest import runSimulator
+
+"""
+Output tick accuracy through the single-process loop in main.py, telemetry waits bounded by DriverSerial's next
+deadline and isReady() polled in between, against the SMC3 simulator and 60 Hz loopback telemetry. Both run in
+their own processes so their threads cannot hold this interpreter's GIL through a deadline.
+
+	python -m unittest discover tests
+"""
+
+
+def sendTelemetry(port: int, stopEvent, rate: float = 60.0):
+	sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	interval = 1.0 / rate
+	totalTime = 0.0
+	nextSend = time.perf_counter()
+	while not stopEvent.is_set():
+		values = [0.0] * 66
+		values[0] = totalTime
+		values[12] = 0.1 * math.sin(totalTime)
+		values[13] = 1.0
+		values[16] = 1.0
+		sender.sendto(struct.pack("66f", *values), ("127.0.0.1", port))
+		totalTime += interval
+		nextSend += interval
+		time.sleep(max(0.0, nextSend - time.perf_counter()))
+	sender.close()
+
+
+def onTimeShare(comHandler: DriverSerial) -> float:
+	return sum(comHandler.tickJitter.counts[:2]) / comHandler.tickJitter.samples
+
+
+def overrunShare(comHandler: DriverSerial) -> float:
+	return comHandler.timer.overruns / comHandler.tickJitter.samples
+
+
+class TestTickLoop(unittest.TestCase):
+	def setUp(self):
+		self.stopEvent = multiprocessing.Event()
+		simulatorPipe, childPipe = multiprocessing.Pipe()
+		self.simulator = multiprocessing.Process(target=runSimulator, args=(childPipe, self.stopEvent))
+		self.simulator.start()
+		childPipe.close()
+		self.simulatorPort = simulatorPipe.recv()
+		self.simulatorPipe = simulatorPipe
+		self.inputSystem = InputHandler()
+		self.inputSystem.gamePlugin.socket.openUDP("127.0.0.1", 0)
+		self.sender = multiprocessing.Process(target=sendTelemetry,
+			args=(self.inputSystem.gamePlugin.socket.socket.getsockname()[1], self.stopEvent))
+		self.sender.start()
+
+	def tearDown(self):
+		self.stopEvent.set()
+		self.sender.join()
+		self.simulatorPipe.recv()
+		self.simulator.join()
+		self.inputSystem.gamePlugin.socket.socket.close()
+
+	def openHandler(self, updateMs: float) -> DriverSerial:
+		comHandler = DriverSerial(updateMs)
+		comHandler.openPort(self.simulatorPort)
+		return comHandler
+
+	def runLoop(self, comHandler: DriverSerial, motionSystem: MotionSystem, seconds: float):
+		comHandler.resetTimer()
+		end = time.perf_counter() + seconds
+		while time.perf_counter() < end:
+			self.inputSystem.update(min(comHandler.timeUntilReady(), 1.0 / 60.0))
+			if comHandler.isReady() is True:
+				motionSystem.inputMotion(self.inputSystem.getDataFrame())
+				comHandler.sendCommand(motionSystem.outputCommand())
+
+	def runWait(self, comHandler: DriverSerial, motionSystem: MotionSystem, seconds: float):
+		# Reference cadence on this machine, the blocking wait with nothing else in the loop
+		comHandler.resetTimer()
+		end = time.perf_counter() + seconds
+		while time.perf_counter() < end:
+			comHandler.waitReady()
+			motionSystem.inputMotion(self.inputSystem.getDataFrame())
+			comHandler.sendCommand(motionSystem.outputCommand())
+
+	def assertLoopMatchesWait(self, updateMs: float, seconds: float, chunks: int = 8):
+		"""
+		Shared test machines are noisy, so the loop is held to what wait() achieves in the same conditions rather
+		than to absolute numbers. The two alternate in short chunks so load changes hit both alike. Compared are
+		the ticks within 100 us of nominal, a wait rounded up to the next millisecond lands at least that late, and
+		whole slots overrun.
+		"""
+		reference = self.openHandler(updateMs)
+		loop = self.openHandler(updateMs)
+		motionSystem = MotionSystem(2, "SMC3")
+		for i in range(chunks):
+			self.runWait(reference, motionSystem, seconds / chunks)
+			self.runLoop(loop, motionSystem, seconds / chunks)
+		reference.connection.close()
+		loop.connection.close()
+		report = reference.tickJitter.render("wait():") + "\n" + loop.tickJitter.render("update/isReady loop:")
+		self.assertGreater(self.inputSystem.gamePlugin.jitterBuffer.accepted, 0)
+		self.assertGreaterEqual(onTimeShare(loop), min(onTimeShare(reference), 0.9) - 0.15, report)
+		self.assertLessEqual(overrunShare(loop), max(overrunShare(reference), 0.01) + 0.05, report)
+
+	def testTicksAt10ms(self):
+		self.assertLoopMatchesWait(10, 2.0)
+
+	def testTicksAt4ms(self):
+		self.assertLoopMatchesWait(4, 2.0)
+
+	def testTicksAt1ms(self):
+		self.assertLoopMatchesWait(1, 1.0)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,242 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import sys
+import os
+import json
+import argparse
+import copy
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from modules.MotionSystem import MotionSystem
+from plugins.games.DirtRally2 import GamePlugin
+from utils.SessionRecorder import loadSegments, poseAxes
+
+"""
+ParameterSweep replays one recorded session through a vectorized copy of the InputHandler -> PoseHandler ->
+AxisHandler -> DriverSMC3 chain under many parameter sets and ranks them. Every set runs over the whole session as
+N-frame arrays. Sets are spread over a process pool, each worker copies the raw pose columns out of the
+memory-mapped session segments once, straight into a single (N, 6) array, and evaluates every set it is handed
+against that.
+
+	python -m tools.ParameterSweep session_dir --scale pitch=0.15,0.25,0.35 --range heave=10,15,20 --invert 1:sway
+
+Scalers, symmetric game ranges and per-axis inverts can be swept, each --invert tries the configured direction and
+its flip. The pipeline has no cueing stage to tune, beyond the live --filters bank that is not modelled here.
+"""
+
+driverMin = 0
+driverMax = 1023
+
+
+def defaultParameters() -> dict:
+	"""
+	The parameters the live pipeline runs with, taken from the same places it loads them
+	"""
+	gamePlugin = GamePlugin()
+	minimums = gamePlugin.loadGameMinimums()
+	maximums = gamePlugin.loadGameMaximums()
+	motionSystem = MotionSystem(2, "SMC3")
+	return {
+		"minimums": [getattr(minimums, axis) for axis in poseAxes],
+		"maximums": [getattr(maximums, axis) for axis in poseAxes],
+		"scalers": [getattr(motionSystem.outputScaler, axis) for axis in poseAxes],
+		"inverts": [[bool(getattr(axis.inverts, name)) for name in poseAxes] for axis in motionSystem.axisHandlers],
+	}
+
+
+def runChain(rawPose: np.ndarray, parameters: dict) -> dict:
+	"""
+	Matches the live pipeline frame for frame only while telemetry is live and with no --filters bank loaded. The
+	idle decay InputHandler applies after a telemetry timeout and the utils.BiquadFilter stages are stateful and
+	not modelled here.
+	:param rawPose: (N, 6) raw pose in degrees and game units, ordered as poseAxes
+	:param parameters: minimums, maximums, scalers (6 each) and inverts (axisCount x 6)
+	:return: arrays for each stage of the chain, targets are the SMC3 10 bit positions
+	"""
+	minimums = np.asarray(parameters["minimums"], dtype=np.float64)
+	maximums = np.asarray(parameters["maximums"], dtype=np.float64)
+	scalers = np.asarray(parameters["scalers"], dtype=np.float64)
+	signs = np.where(np.asarray(parameters["inverts"], dtype=bool), -1.0, 1.0)
+
+	clamped = np.clip(rawPose, minimums, maximums)
+	normalized = (clamped - minimums) * 2.0 / (maximums - minimums) - 1.0
+	scaled = normalized * scalers
+	commands = scaled @ signs.T
+	denormalized = (commands + 1.0) * (driverMax - driverMin) / 2.0 + driverMin
+	targets = np.clip(denormalized, driverMin, driverMax).astype(np.int64)
+	return {
+		"inputClipped": (rawPose < minimums) | (rawPose > maximums),
+		"normalized": normalized,
+		"scaled": scaled,
+		"commands": commands,
+		"outputClipped": (denormalized < driverMin) | (denormalized > driverMax),
+		"targets": targets,
+	}
+
+
+def scoreChain(chain: dict, frameTime: float, velocityLimit: float) -> dict:
+	"""
+	Score one run. Travel use rewards spreading the motion over the actuator range, clip time and actuator velocity
+	beyond what the hardware can follow are penalized.
+	"""
+	targets = chain["targets"].astype(np.float64)
+	steps = np.abs(np.diff(targets, axis=0))
+	clipFraction = float(chain["outputClipped"].any(axis=1).mean())
+	travel = float(steps.sum())
+	peakVelocity = float(steps.max() / frameTime) if len(steps) else 0.0
+	travelUse = float(targets.std(axis=0).mean() / (driverMax - driverMin))
+	overspeed = max(0.0, peakVelocity - velocityLimit) / velocityLimit
+	return {
+		"score": travelUse - 2.0 * clipFraction - 0.1 * overspeed,
+		"clipTime": clipFraction * len(targets) * frameTime,
+		"clipFraction": clipFraction,
+		"inputClipFraction": float(chain["inputClipped"].any(axis=1).mean()),
+		"travel": travel,
+		"travelUse": travelUse,
+		"peakVelocity": peakVelocity,
+	}
+
+
+workerSession = None
+
+
+def loadWorkerSession(path: str):
+	global workerSession
+	segments = loadSegments(path, ["time"] + ["raw_" + axis for axis in poseAxes])
+	rawPose = np.empty((sum(len(segment["time"]) for segment in segments), len(poseAxes)))
+	row = 0
+	for segment in segments:
+		rows = len(segment["time"])
+		for i, axis in enumerate(poseAxes):
+			rawPose[row:row + rows, i] = segment["raw_" + axis]
+		row += rows
+	frameTimes = np.diff(np.concatenate([segment["time"] for segment in segments])) if segments else np.empty(0)
+	frameTime = float(np.median(frameTimes)) if len(frameTimes) else 0.01
+	workerSession = (rawPose, frameTime)
+
+
+def evaluate(task: (dict, float)) -> dict:
+	parameters, velocityLimit = task
+	rawPose, frameTime = workerSession
+	result = scoreChain(runChain(rawPose, parameters), frameTime, velocityLimit)
+	result["parameters"] = parameters
+	return result
+
+
+def buildParameterSets(base: dict, scales: dict, ranges: dict, inverts: [(int, str)] = ()) -> [dict]:
+	"""
+	Cartesian product of the swept values. Ranges are symmetric, a value of 15 means -15 to 15. Each invert toggle,
+	(actuator index, pose axis), is tried as configured and flipped.
+	"""
+	sweeps = [("scalers", axis, values) for axis, values in scales.items()]
+	sweeps += [("range", axis, values) for axis, values in ranges.items()]
+	sweeps += [("invert", toggle, [False, True]) for toggle in inverts]
+	parameterSets = []
+	for combination in itertools.product(*[values for _, _, values in sweeps]):
+		parameters = copy.deepcopy(base)
+		for (kind, axis, _), value in zip(sweeps, combination):
+			if kind == "invert":
+				actuator, name = axis
+				index = poseAxes.index(name)
+				parameters["inverts"][actuator][index] = base["inverts"][actuator][index] != value
+				continue
+			index = poseAxes.index(axis)
+			if kind == "scalers":
+				parameters["scalers"][index] = value
+			else:
+				parameters["minimums"][index] = -value
+				parameters["maximums"][index] = value
+		parameterSets.append(parameters)
+	return parameterSets
+
+
+def runSweep(path: str, parameterSets: [dict], velocityLimit: float = 2000.0, workers: int = None) -> [dict]:
+	"""
+	:return: results ranked best first
+	"""
+	tasks = [(parameters, velocityLimit) for parameters in parameterSets]
+	with ProcessPoolExecutor(max_workers=workers, initializer=loadWorkerSession, initargs=(path,)) as pool:
+		chunk = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+		results = list(pool.map(evaluate, tasks, chunksize=chunk))
+	results.sort(key=lambda result: result["score"], reverse=True)
+	return results
+
+
+def formatTable(results: [dict], base: dict, limit: int) -> str:
+	lines = [f"{'rank':>4} {'score':>7} {'clip s':>7} {'clip %':>6} {'in clip %':>9} {'travel':>9} "
+		f"{'peak vel':>8}  changes"]
+	for rank, result in enumerate(results[:limit], 1):
+		parameters = result["parameters"]
+		changes = []
+		for i, axis in enumerate(poseAxes):
+			if parameters["scalers"][i] != base["scalers"][i]:
+				changes.append(f"{axis} scale {parameters['scalers'][i]:g}")
+			if parameters["maximums"][i] != base["maximums"][i] or parameters["minimums"][i] != base["minimums"][i]:
+				changes.append(f"{axis} range {parameters['minimums'][i]:g}..{parameters['maximums'][i]:g}")
+		for actuator, (inverts, baseInverts) in enumerate(zip(parameters["inverts"], base["inverts"])):
+			for i, axis in enumerate(poseAxes):
+				if inverts[i] != baseInverts[i]:
+					changes.append(f"actuator {actuator} {axis} " + ("inverted" if inverts[i] else "not inverted"))
+		lines.append(
+			f"{rank:>4} {result['score']:7.3f} {result['clipTime']:7.1f} {result['clipFraction'] * 100:6.2f} "
+			f"{result['inputClipFraction'] * 100:9.2f} {result['travel']:9.0f} {result['peakVelocity']:8.0f}  "
+			+ (", ".join(changes) or "defaults")
+		)
+	return "\n".join(lines)
+
+
+def parseSweep(entries: [str]) -> dict:
+	out = {}
+	for entry in entries:
+		axis, _, values = entry.partition("=")
+		if axis not in poseAxes:
+			sys.exit("Unknown axis " + axis + ", expected one of " + ", ".join(poseAxes))
+		out[axis] = [float(value) for value in values.split(",")]
+	return out
+
+
+def parseInverts(entries: [str], actuatorCount: int) -> [(int, str)]:
+	out = []
+	for entry in entries:
+		actuator, _, axis = entry.partition(":")
+		if not actuator.isdigit() or int(actuator) >= actuatorCount or axis not in poseAxes:
+			sys.exit("Bad invert " + entry + ", expected ACTUATOR:AXIS with ACTUATOR below " + str(actuatorCount)
+				+ " and AXIS one of " + ", ".join(poseAxes))
+		out.append((int(actuator), axis))
+	return out
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Rank motion parameter sets against a recorded session")
+	parser.add_argument("session", help="Session directory written by --record")
+	parser.add_argument("--scale", action="append", default=[], metavar="AXIS=V1,V2,...", help="Scaler values")
+	parser.add_argument("--range", action="append", default=[], metavar="AXIS=V1,V2,...",
+		help="Symmetric game range values")
+	parser.add_argument("--invert", action="append", default=[], metavar="ACTUATOR:AXIS",
+		help="Try this actuator's axis both as configured and inverted")
+	parser.add_argument("--velocity-limit", type=float, default=2000.0, help="Actuator speed in counts per second")
+	parser.add_argument("--workers", type=int, help="Worker processes, defaults to every core")
+	parser.add_argument("--top", type=int, default=20, help="Rows to print")
+	parser.add_argument("--json", metavar="FILE", help="Also write the full ranked results to FILE")
+	args = parser.parse_args()
+
+	base = defaultParameters()
+	parameterSets = buildParameterSets(base, parseSweep(args.scale), parseSweep(args.range),
+		parseInverts(args.invert, len(base["inverts"])))
+	print("Evaluating " + str(len(parameterSets)) + " parameter sets")
+	results = runSweep(args.session, parameterSets, args.velocity_limit, args.workers)
+	print(formatTable(results, base, args.top))
+	if args.json:
+		with open(args.json, "w") as out:
+			json.dump(results, out, indent=1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,236 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import sys
+import tty
+import time
+import select
+import threading
+
+"""
+SMC3Simulator stands in for an Arduino running the SMC3 firmware. It opens a pseudo-terminal that DriverSerial can
+connect to, parses the [A<msb><lsb>] position frames and models each actuator with a speed, acceleration and
+proportional lag limit so the host side can be exercised without hardware.
+"""
+
+
+class SimulatedActuator:
+	def __init__(self, maxSpeed: float, maxAccel: float, gain: float):
+		self.maxSpeed: float = maxSpeed		# counts per second
+		self.maxAccel: float = maxAccel		# counts per second squared
+		self.gain: float = gain				# proportional gain (1/s) standing in for the firmware PID lag
+		self.target: float = 511.0
+		self.position: float = 511.0
+		self.velocity: float = 0.0
+		self.targetChangedAt: int = 0
+		self.settled: bool = True
+
+	def setTarget(self, target: int, now: int):
+		if target != self.target:
+			self.target = float(target)
+			self.targetChangedAt = now
+			self.settled = False
+
+	def step(self, dt: float):
+		desiredVelocity = (self.target - self.position) * self.gain
+		if desiredVelocity > self.maxSpeed:
+			desiredVelocity = self.maxSpeed
+		if desiredVelocity < -self.maxSpeed:
+			desiredVelocity = -self.maxSpeed
+		accelStep = self.maxAccel * dt
+		if desiredVelocity - self.velocity > accelStep:
+			self.velocity += accelStep
+		elif self.velocity - desiredVelocity > accelStep:
+			self.velocity -= accelStep
+		else:
+			self.velocity = desiredVelocity
+		self.position += self.velocity * dt
+		if self.position > 1023.0:
+			self.position = 1023.0
+			self.velocity = 0.0
+		if self.position < 0.0:
+			self.position = 0.0
+			self.velocity = 0.0
+
+
+class SMC3Simulator:
+	def __init__(self, axisCount: int = 2, maxSpeed: float = 2000.0, maxAccel: float = 20000.0, gain: float = 25.0):
+		self.axisNames = ["A", "B", "C"][:axisCount]
+		self.actuators = [SimulatedActuator(maxSpeed, maxAccel, gain) for _ in self.axisNames]
+		self.physicsHz: int = 1000
+		self.settleTolerance: float = 4.0	# counts from target before a move counts as complete
+		self.monitor: bool = False			# SMC3 only streams feedback after a [mo1] request
+		self.masterFd = None
+		self.slaveFd = None
+		self.portName = None
+		self.rxBuffer = bytearray()
+		self.running: bool = False
+		self.thread = None
+		self.lock = threading.Lock()
+		self.resetStats()
+
+	def resetStats(self):
+		self.frameCount: int = 0
+		self.badFrameCount: int = 0
+		self.firstFrameTime: int = 0
+		self.lastFrameTime: int = 0
+		self.frameIntervalMax: int = 0
+		self.trackingErrorSquared: float = 0.0
+		self.trackingErrorMax: float = 0.0
+		self.trackingSamples: int = 0
+		self.settleLatencies: [float] = []
+		self.settleLatencyLimit: int = 10000
+
+	def openPort(self) -> str:
+		self.masterFd, self.slaveFd = os.openpty()
+		tty.setraw(self.slaveFd)
+		tty.setraw(self.masterFd)
+		self.portName = os.ttyname(self.slaveFd)
+		return self.portName
+
+	def start(self) -> str:
+		if self.masterFd is None:
+			self.openPort()
+		self.running = True
+		self.thread = threading.Thread(target=self.run, name="SMC3Simulator", daemon=True)
+		self.thread.start()
+		return self.portName
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+		for fd in (self.masterFd, self.slaveFd):
+			if fd is not None:
+				os.close(fd)
+		self.masterFd = None
+		self.slaveFd = None
+
+	def run(self):
+		stepNs = 1000000000 // self.physicsHz
+		lastStep = time.perf_counter_ns()
+		while self.running:
+			readable, _, _ = select.select([self.masterFd], [], [], stepNs / 1000000000)
+			if readable:
+				try:
+					self.rxBuffer += os.read(self.masterFd, 4096)
+				except OSError:
+					# Host side closed the port, keep the model running until it reopens
+					pass
+				self.parseFrames()
+			now = time.perf_counter_ns()
+			if now - lastStep >= stepNs:
+				self.stepActuators((now - lastStep) / 1000000000, now)
+				lastStep = now
+
+	def parseFrames(self):
+		"""
+		Frames are 5 bytes, [ (ident) (byte 1) (byte 2) ]. The position bytes may contain any value, so a frame
+		is only accepted when both brackets line up, otherwise the parser slips one byte to resynchronize.
+		"""
+		buf = self.rxBuffer
+		while len(buf) >= 5:
+			if buf[0] != ord("[") or buf[4] != ord("]"):
+				del buf[0]
+				self.badFrameCount += 1
+				continue
+			ident = chr(buf[1])
+			if ident in self.axisNames:
+				self.receivePosition(self.axisNames.index(ident), (buf[2] << 8) | buf[3])
+			elif buf[1:4] == b"mo1":
+				self.monitor = True
+			elif buf[1:4] == b"mo0":
+				self.monitor = False
+			del buf[0:5]
+
+	def receivePosition(self, axis: int, position: int):
+		now = time.perf_counter_ns()
+		if position > 1023:
+			position = 1023
+		with self.lock:
+			self.actuators[axis].setTarget(position, now)
+			# Each host update carries a frame for every axis, count the update on its first axis
+			if axis == 0:
+				if self.frameCount == 0:
+					self.firstFrameTime = now
+				elif now - self.lastFrameTime > self.frameIntervalMax:
+					self.frameIntervalMax = now - self.lastFrameTime
+				self.lastFrameTime = now
+				self.frameCount += 1
+		if self.monitor and axis == len(self.actuators) - 1:
+			self.sendFeedback()
+
+	def stepActuators(self, dt: float, now: int):
+		with self.lock:
+			for actuator in self.actuators:
+				actuator.step(dt)
+				error = abs(actuator.target - actuator.position)
+				self.trackingErrorSquared += error * error
+				self.trackingSamples += 1
+				if error > self.trackingErrorMax:
+					self.trackingErrorMax = error
+				if not actuator.settled and error <= self.settleTolerance:
+					actuator.settled = True
+					if len(self.settleLatencies) < self.settleLatencyLimit:
+						self.settleLatencies.append((now - actuator.targetChangedAt) / 1000000)
+
+	def sendFeedback(self):
+		"""
+		SMC3 feedback matches its command framing with 8 bit values, [ (ident) (feedback / 4) (target / 4) ]
+		"""
+		out = bytearray()
+		for name, actuator in zip(self.axisNames, self.actuators):
+			out += bytes([ord("["), ord(name), int(actuator.position) >> 2, int(actuator.target) >> 2, ord("]")])
+		try:
+			os.write(self.masterFd, out)
+		except OSError:
+			pass
+
+	def getStats(self) -> dict:
+		with self.lock:
+			duration = (self.lastFrameTime - self.firstFrameTime) / 1000000000
+			latencies = sorted(self.settleLatencies)
+			stats = {
+				"frames": self.frameCount,
+				"badBytes": self.badFrameCount,
+				"commandRateHz": (self.frameCount - 1) / duration if duration > 0 else 0.0,
+				"frameIntervalMaxMs": self.frameIntervalMax / 1000000,
+				"trackingErrorRms": (self.trackingErrorSquared / self.trackingSamples) ** 0.5
+				if self.trackingSamples else 0.0,
+				"trackingErrorMax": self.trackingErrorMax,
+				"latencySamples": len(latencies),
+				"latencyAvgMs": sum(latencies) / len(latencies) if latencies else 0.0,
+				"latencyP95Ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+				"latencyMaxMs": latencies[-1] if latencies else 0.0,
+				"positions": [actuator.position for actuator in self.actuators],
+			}
+		return stats
+
+
+def main():
+	simulator = SMC3Simulator()
+	simulator.monitor = "--monitor" in sys.argv
+	print("SMC3 simulator listening on " + simulator.start())
+	try:
+		while True:
+			time.sleep(1)
+			stats = simulator.getStats()
+			print(
+				f"{stats['commandRateHz']:6.1f} Hz  "
+				f"err rms {stats['trackingErrorRms']:6.1f} max {stats['trackingErrorMax']:6.1f}  "
+				f"latency avg {stats['latencyAvgMs']:5.1f} p95 {stats['latencyP95Ms']:5.1f} "
+				f"max {stats['latencyMaxMs']:5.1f} ms  "
+				f"pos {' '.join(str(int(p)) for p in stats['positions'])}"
+			)
+	except KeyboardInterrupt:
+		simulator.stop()
+
+
+if __name__ == "__main__":
+	main()
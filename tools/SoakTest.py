@@ -0,0 +1,252 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import gc
+import sys
+import signal
+import time
+import socket
+import argparse
+import multiprocessing
+import numpy as np
+import psutil
+from modules.InputHandler import InputHandler
+from modules.MotionSystem import MotionSystem
+from plugins.games.DirtRally2 import DataPacketStructure, numDataFieldsInPacket
+from plugins.outputs.communication.DriverSerial import DriverSerial
+from tools.SMC3Simulator import SMC3Simulator
+from utils.SessionRecorder import loadSession, telemetryFields
+
+"""
+SoakTest replays recorded sessions through the real ProtocolHandlerUDP -> InputHandler -> MotionSystem ->
+DriverSerial path, sped up, against the SMC3 simulator on a pty. The packet sender and the simulator run in their
+own processes so only the pipeline shares this interpreter. Every sample interval it logs RSS, live object count,
+loop and output rates and the packet-to-serial latency percentiles, and at the end fails if any of them drifted past
+its threshold.
+
+	python -m tools.SoakTest session_dir --speedup 10 --duration 3600
+"""
+
+# DataPacketUnpacked names that differ from their DataPacketStructure slot
+packetFieldNames = {"engineMaxRPM": "maxRPM"}
+
+
+def buildPackets(path: str) -> (np.ndarray, np.ndarray):
+	"""
+	Rebuild game datagrams from the recorded telemetry, fields the recorder does not keep stay zero. The recorder
+	logs once per output frame so the same telemetry frame repeats across rows, only rows that move game time past
+	every earlier row are kept.
+	:return: (frames, 66) float32 packets and the game time step before each, the first is the typical step
+	"""
+	session = loadSession(path, ["telemetry_" + field for field in telemetryFields])
+	totalTime = session["telemetry_totalTime"]
+	keep = np.ones(len(totalTime), dtype=bool)
+	keep[1:] = totalTime[1:] > np.maximum.accumulate(totalTime)[:-1]
+	packets = np.zeros((int(keep.sum()), numDataFieldsInPacket), dtype=np.float32)
+	for field in telemetryFields:
+		packets[:, DataPacketStructure[packetFieldNames.get(field, field)].value] = session["telemetry_" + field][keep]
+	steps = np.diff(totalTime[keep].astype(np.float64), prepend=0.0)
+	steps[0] = float(np.median(steps[1:])) if len(steps) > 1 else 1.0 / 60.0
+	return packets, steps
+
+
+def runReplay(paths: [str], port: int, speedup: float, stopEvent):
+	"""
+	Send the sessions round and round at speedup times their recorded rate, paced by the recorded game time. Game
+	time keeps counting up across repeats so the jitter buffer sees one long session.
+	"""
+	# Ctrl+C reaches the whole process group, the parent stops this through stopEvent
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	sessions = [buildPackets(path) for path in paths]
+	sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	address = ("127.0.0.1", port)
+	timeOffset = 0.0
+	deadline = time.perf_counter_ns()
+	while not stopEvent.is_set():
+		for packets, steps in sessions:
+			intervals = (steps / speedup * 1000000000).astype(np.int64)
+			start = float(packets[0, DataPacketStructure.totalTime.value])
+			for packet, interval in zip(packets, intervals):
+				if stopEvent.is_set():
+					return
+				packet = packet.copy()
+				packet[DataPacketStructure.totalTime.value] += timeOffset - start
+				deadline += int(interval)
+				sleepNs = deadline - time.perf_counter_ns() - 500000
+				if sleepNs > 0:
+					time.sleep(sleepNs / 1000000000)
+				while time.perf_counter_ns() < deadline:
+					pass
+				sender.sendto(packet.tobytes(), address)
+			timeOffset += float(packets[-1, DataPacketStructure.totalTime.value]) - start + float(steps[0])
+
+
+def runSimulator(connection, stopEvent):
+	# Left to the parent like the replay, so the stats still arrive after Ctrl+C
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	simulator = SMC3Simulator()
+	connection.send(simulator.start())
+	stopEvent.wait()
+	connection.send(simulator.getStats())
+	simulator.stop()
+
+
+class SoakMonitor:
+	def __init__(self, inputSystem: InputHandler, comHandler: DriverSerial, latencyCapacity: int = 200000):
+		self.inputSystem = inputSystem
+		self.comHandler = comHandler
+		self.process = psutil.Process()
+		self.samples: [dict] = []
+		# Latencies of the current window in a preallocated list
+		self.latencies: [float] = [0.0] * latencyCapacity
+		self.latencyCount: int = 0
+		self.lastTime = time.perf_counter()
+		self.lastLoops: int = 0
+		self.lastWrites: int = 0
+		self.started = self.lastTime
+
+	def recordLatency(self):
+		if self.latencyCount < len(self.latencies):
+			self.latencies[self.latencyCount] = time.time() - self.inputSystem.gamePlugin.socket.lastPacket
+			self.latencyCount += 1
+
+	def sample(self) -> dict:
+		now = time.perf_counter()
+		elapsed = now - self.lastTime
+		loops = self.inputSystem.loopCount
+		writes = self.comHandler.writeCount
+		latencies = np.array(self.latencies[:self.latencyCount]) * 1000
+		sample = {
+			"elapsed": now - self.started,
+			"rssMb": self.process.memory_info().rss / 1048576,
+			"objects": len(gc.get_objects()),
+			"loopHz": (loops - self.lastLoops) / elapsed,
+			"outputHz": (writes - self.lastWrites) / elapsed,
+			"p50Ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+			"p99Ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+			"maxMs": float(latencies.max()) if len(latencies) else 0.0,
+			"overruns": self.comHandler.timer.overruns,
+		}
+		self.samples.append(sample)
+		self.lastTime = now
+		self.lastLoops = loops
+		self.lastWrites = writes
+		self.latencyCount = 0
+		return sample
+
+
+def formatSample(sample: dict) -> str:
+	return (
+		f"{sample['elapsed']:8.0f}s  rss {sample['rssMb']:7.1f} MB  objects {sample['objects']:8d}  "
+		f"loop {sample['loopHz']:7.1f} Hz  output {sample['outputHz']:7.1f} Hz  "
+		f"latency p50 {sample['p50Ms']:6.2f} p99 {sample['p99Ms']:6.2f} max {sample['maxMs']:6.2f} ms  "
+		f"overruns {sample['overruns']}"
+	)
+
+
+def checkThresholds(samples: [dict], args) -> [str]:
+	"""
+	Memory is compared against the second window, the first absorbs startup. Output rate is compared against the
+	nominal sped up rate.
+	"""
+	if len(samples) < 3:
+		return ["Too few samples to judge, run longer or sample more often"]
+	baseline = samples[1]
+	nominalHz = 1000.0 / args.update_ms * args.speedup
+	failures = []
+	for sample in samples[2:]:
+		when = f" at {sample['elapsed']:.0f}s"
+		if sample["rssMb"] - baseline["rssMb"] > args.max_rss_growth:
+			failures.append(f"RSS grew {sample['rssMb'] - baseline['rssMb']:.1f} MB" + when)
+		if sample["objects"] > baseline["objects"] * (1 + args.max_object_growth / 100):
+			failures.append(f"Object count grew {sample['objects'] - baseline['objects']}" + when)
+		if abs(sample["outputHz"] - nominalHz) > nominalHz * args.max_rate_drift / 100:
+			failures.append(f"Output rate drifted to {sample['outputHz']:.1f} Hz" + when)
+		if sample["p99Ms"] > args.max_p99:
+			failures.append(f"p99 latency {sample['p99Ms']:.2f} ms" + when)
+	return failures
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Accelerated long-run stability test of the motion pipeline")
+	parser.add_argument("sessions", nargs="+", help="Session directories written by --record")
+	parser.add_argument("--speedup", type=float, default=10.0, help="Replay and output rate multiplier")
+	parser.add_argument("--duration", type=float, default=3600.0, help="Wall clock seconds to run")
+	parser.add_argument("--sample-interval", type=float, default=10.0, help="Seconds between health samples")
+	parser.add_argument("--update-ms", type=float, default=10.0, help="Output interval before speedup")
+	parser.add_argument("--max-rss-growth", type=float, default=50.0, help="MB over the first window")
+	parser.add_argument("--max-object-growth", type=float, default=10.0, help="Percent over the first window")
+	parser.add_argument("--max-rate-drift", type=float, default=5.0,
+		help="Percent output rate may stray from nominal")
+	parser.add_argument("--max-p99", type=float, default=10.0, help="Packet to serial write latency, ms")
+	args = parser.parse_args()
+
+	stopEvent = multiprocessing.Event()
+	simulatorPipe, childPipe = multiprocessing.Pipe()
+	simulator = multiprocessing.Process(target=runSimulator, args=(childPipe, stopEvent), name="SMC3Simulator")
+	simulator.start()
+	# Only the child's end stays open, so a dead simulator reads as EOF rather than blocking forever
+	childPipe.close()
+
+	comHandler = DriverSerial(args.update_ms / args.speedup)
+	comHandler.openPort(simulatorPipe.recv())
+	inputSystem = InputHandler()
+	inputSystem.gamePlugin.socket.openUDP("127.0.0.1", 0)
+	port = inputSystem.gamePlugin.socket.socket.getsockname()[1]
+	motionSystem = MotionSystem(2, "SMC3")
+	replay = multiprocessing.Process(target=runReplay, args=(args.sessions, port, args.speedup, stopEvent),
+		name="Replay")
+	replay.start()
+
+	monitor = SoakMonitor(inputSystem, comHandler)
+	print(f"Soaking for {args.duration:.0f}s at {args.speedup:g}x, {args.duration * args.speedup / 3600:.1f}h of operation")
+	end = time.perf_counter() + args.duration
+	nextSample = time.perf_counter() + args.sample_interval
+	# Starting the replay and simulator processes is not a missed frame
+	comHandler.resetTimer()
+	try:
+		while time.perf_counter() < end:
+			inputSystem.update(min(comHandler.timeUntilReady(), 1.0 / 60.0))
+			if comHandler.isReady() is True:
+				motionSystem.inputMotion(inputSystem.getDataFrame())
+				comHandler.sendCommand(motionSystem.outputCommand())
+				if inputSystem.gamePlugin.getRxStatus():
+					monitor.recordLatency()
+			if time.perf_counter() >= nextSample:
+				print(formatSample(monitor.sample()))
+				nextSample += args.sample_interval
+	except KeyboardInterrupt:
+		print("Interrupted")
+	finally:
+		stopEvent.set()
+		replay.join()
+		simulatorStats = None
+		try:
+			if simulatorPipe.poll(5.0):
+				simulatorStats = simulatorPipe.recv()
+		except EOFError:
+			pass
+		simulator.join(5.0)
+
+	if simulatorStats is None:
+		print("Simulator exited without reporting stats")
+	else:
+		print(
+			f"Simulator: {simulatorStats['frames']} frames at {simulatorStats['commandRateHz']:.1f} Hz, "
+			f"tracking error rms {simulatorStats['trackingErrorRms']:.1f}, bad bytes {simulatorStats['badBytes']}"
+		)
+	failures = checkThresholds(monitor.samples, args)
+	for failure in failures:
+		print("FAIL " + failure)
+	if failures:
+		sys.exit(1)
+	print("PASS")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,139 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import json
+import argparse
+import numpy as np
+from utils.SessionRecorder import loadSession, poseAxes
+from utils.BiquadFilter import lowpassCoefficients, notchCoefficients
+
+"""
+SpectralAnalysis looks for actuator buzz in a recorded session. It estimates the power spectral density of each pose
+and per-axis command channel with Welch's method and flags narrow resonant peaks and broadband high frequency content.
+The pose channels are reported to show where the buzz comes from, filters are only designed for the commands: a
+low-pass where most of the channel's energy ends, plus notches on resonances below it. The commands are a linear mix
+of the pose, filtering both would notch the same resonances twice and stack phase lag. Commands are recorded before
+any filter bank, so a bank designed from a session recorded with --filters replaces that bank rather than adding to it.
+
+	python -m tools.SpectralAnalysis session_dir --output filters.json
+	python main.py --filters filters.json
+"""
+
+
+def welchPsd(signal: np.ndarray, sampleRate: float, segmentLength: int = 256) -> (np.ndarray, np.ndarray):
+	"""
+	:return: frequencies and one-sided power spectral density, averaged over half-overlapping Hann windows
+	"""
+	segmentLength = min(segmentLength, len(signal))
+	step = max(segmentLength // 2, 1)
+	segments = np.lib.stride_tricks.sliding_window_view(signal, segmentLength)[::step]
+	segments = segments - segments.mean(axis=1, keepdims=True)
+	window = np.hanning(segmentLength)
+	spectra = np.fft.rfft(segments * window, axis=1)
+	psd = (np.abs(spectra) ** 2).mean(axis=0) / (sampleRate * (window ** 2).sum())
+	psd[1:-1] *= 2
+	return np.fft.rfftfreq(segmentLength, 1.0 / sampleRate), psd
+
+
+def findPeaks(frequencies: np.ndarray, psd: np.ndarray, minimumFrequency: float, thresholdDb: float) -> [float]:
+	"""
+	Local maxima standing thresholdDb above the median level of the band above minimumFrequency
+	"""
+	band = frequencies >= minimumFrequency
+	if band.sum() < 3:
+		return []
+	floor = np.median(psd[band])
+	if floor <= 0:
+		return []
+	limit = floor * 10 ** (thresholdDb / 10)
+	isPeak = (psd[1:-1] > psd[:-2]) & (psd[1:-1] >= psd[2:]) & (psd[1:-1] > limit) & band[1:-1]
+	return [float(frequency) for frequency in frequencies[1:-1][isPeak]]
+
+
+def cutoffFrequency(frequencies: np.ndarray, psd: np.ndarray, energyFraction: float) -> float:
+	cumulative = np.cumsum(psd)
+	if cumulative[-1] <= 0:
+		return float(frequencies[-1])
+	return float(frequencies[np.searchsorted(cumulative, cumulative[-1] * energyFraction)])
+
+
+def analyseChannel(signal: np.ndarray, sampleRate: float, minimumFrequency: float, thresholdDb: float,
+		energyFraction: float, minimumCutoff: float) -> dict:
+	frequencies, psd = welchPsd(signal, sampleRate)
+	total = psd.sum()
+	cutoff = min(max(cutoffFrequency(frequencies, psd, energyFraction), minimumCutoff), sampleRate * 0.45)
+	peaks = findPeaks(frequencies, psd, minimumFrequency, thresholdDb)
+	return {
+		"cutoff": cutoff,
+		"peaks": peaks,
+		"highFrequencyShare": float(psd[frequencies >= minimumFrequency].sum() / total) if total > 0 else 0.0,
+	}
+
+
+def designFilters(analysis: dict, sampleRate: float, notchQ: float) -> [dict]:
+	stages = []
+	if analysis["cutoff"] < sampleRate * 0.45:
+		stages.append({"type": "lowpass", "frequency": analysis["cutoff"], "q": 0.7071,
+			"coefficients": lowpassCoefficients(analysis["cutoff"], sampleRate)})
+	for peak in analysis["peaks"]:
+		# Peaks above the cutoff are already handled by the low-pass
+		if peak < analysis["cutoff"]:
+			stages.append({"type": "notch", "frequency": peak, "q": notchQ,
+				"coefficients": notchCoefficients(peak, sampleRate, notchQ)})
+	return stages
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Find noisy bands in a recorded session and design filters")
+	parser.add_argument("session", help="Session directory written by --record")
+	parser.add_argument("--output", metavar="FILE", help="Write the filter bank JSON for main.py --filters")
+	parser.add_argument("--min-frequency", type=float, default=2.0,
+		help="Content below this is intended motion and never flagged, Hz")
+	parser.add_argument("--threshold-db", type=float, default=12.0, help="Peak prominence over the band median")
+	parser.add_argument("--energy", type=float, default=0.99, help="Energy fraction the low-pass keeps")
+	parser.add_argument("--min-cutoff", type=float, default=5.0, help="Lowest low-pass cutoff, Hz")
+	parser.add_argument("--notch-q", type=float, default=2.0, help="Notch quality factor")
+	args = parser.parse_args()
+
+	with open(os.path.join(args.session, "session.json")) as source:
+		manifest = json.load(source)
+	if "filters" not in manifest:
+		print("Warning: session predates filter bank logging, if it was recorded with --filters its commands are "
+			"already filtered and a bank designed from them must not be stacked on that one")
+	elif manifest["filters"]:
+		print("Recorded with filters " + manifest["filters"] + ", commands are from before them, use the new bank "
+			"in place of that one")
+	session = loadSession(args.session)
+	sampleRate = 1.0 / float(np.median(np.diff(session["time"])))
+	channels = {axis: session["normalized_" + axis] for axis in poseAxes}
+	channels.update({name: values for name, values in session.items() if name.startswith("command_")})
+
+	design = {"sampleRate": sampleRate, "channels": {}}
+	print(f"{len(session['time'])} frames at {sampleRate:.1f} Hz")
+	for name, signal in channels.items():
+		if np.ptp(signal) == 0:
+			continue
+		analysis = analyseChannel(np.asarray(signal, dtype=np.float64), sampleRate, args.min_frequency,
+			args.threshold_db, args.energy, args.min_cutoff)
+		stages = designFilters(analysis, sampleRate, args.notch_q) if name.startswith("command_") else []
+		print(
+			f"{name:>10}  above {args.min_frequency:g} Hz {analysis['highFrequencyShare'] * 100:5.1f}% of power  "
+			f"cutoff {analysis['cutoff']:5.1f} Hz  peaks "
+			+ (", ".join(f"{peak:.1f}" for peak in analysis["peaks"]) or "none")
+		)
+		if stages:
+			design["channels"][name] = stages
+	if args.output:
+		with open(args.output, "w") as out:
+			json.dump(design, out, indent=1)
+		print("Filter bank written to " + args.output)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,83 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import math
+import json
+
+"""
+Biquad filters for smoothing the motion stream per sample with O(1) state. Coefficients come from the RBJ audio EQ
+cookbook and are normalized so a0 = 1. A FilterBank holds a cascade per per-axis command channel, named command_0,
+command_1, ... The commands are the only point filtered, they are what the actuators see and each pose axis reaches
+them through a linear mix, so filtering the pose as well would only stack phase lag.
+"""
+
+
+def lowpassCoefficients(frequency: float, sampleRate: float, q: float = 0.7071) -> [float]:
+	w0 = 2 * math.pi * frequency / sampleRate
+	alpha = math.sin(w0) / (2 * q)
+	cosw0 = math.cos(w0)
+	a0 = 1 + alpha
+	return [(1 - cosw0) / 2 / a0, (1 - cosw0) / a0, (1 - cosw0) / 2 / a0, -2 * cosw0 / a0, (1 - alpha) / a0]
+
+
+def notchCoefficients(frequency: float, sampleRate: float, q: float = 2.0) -> [float]:
+	w0 = 2 * math.pi * frequency / sampleRate
+	alpha = math.sin(w0) / (2 * q)
+	cosw0 = math.cos(w0)
+	a0 = 1 + alpha
+	return [1 / a0, -2 * cosw0 / a0, 1 / a0, -2 * cosw0 / a0, (1 - alpha) / a0]
+
+
+class Biquad:
+	def __init__(self, coefficients: [float]):
+		self.b0, self.b1, self.b2, self.a1, self.a2 = coefficients
+		self.z1: float = 0.0
+		self.z2: float = 0.0
+
+	def process(self, value: float) -> float:
+		# Transposed direct form II
+		out = self.b0 * value + self.z1
+		self.z1 = self.b1 * value - self.a1 * out + self.z2
+		self.z2 = self.b2 * value - self.a2 * out
+		return out
+
+
+class FilterBank:
+	def __init__(self, sampleRate: float):
+		self.sampleRate = sampleRate
+		self.channels: dict = {}
+
+	def addFilter(self, channel: str, coefficients: [float]):
+		self.channels.setdefault(channel, []).append(Biquad(coefficients))
+
+	def process(self, channel: str, value: float) -> float:
+		for stage in self.channels.get(channel, ()):
+			value = stage.process(value)
+		return value
+
+	def processCommands(self, commands: [float]) -> [float]:
+		return [self.process("command_" + str(i), value) for i, value in enumerate(commands)]
+
+
+def loadFilterBank(path: str, outputRate: float = None) -> FilterBank:
+	"""
+	Load a bank written by tools.SpectralAnalysis
+	:param outputRate: Hz the bank will run at, warns when it was designed for another rate
+	"""
+	with open(path) as source:
+		design = json.load(source)
+	bank = FilterBank(design["sampleRate"])
+	for channel, stages in design["channels"].items():
+		if not channel.startswith("command_"):
+			print("Ignoring filters on " + channel + ", only per-axis command channels are filtered")
+			continue
+		for stage in stages:
+			bank.addFilter(channel, stage["coefficients"])
+	if outputRate is not None and abs(bank.sampleRate - outputRate) > outputRate * 0.05:
+		print(f"Warning: filters designed for {bank.sampleRate:.1f} Hz, output runs at {outputRate:.1f} Hz")
+	return bank
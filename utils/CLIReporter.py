@@ -7,23 +7,114 @@
 # THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from plugins.games.DirtRally2 import GamePlugin
-from utils import DataFrame
+from utils.DataFrame import DataFrame
+import sys
 import time
+import threading
 
-
+"""
+Reporter keeps diagnostics off the motion loop. The loop only drops cheap snapshots into slots at snapshotInterval,
+a background thread renders them as a refreshing terminal dashboard every reportInterval.
+"""
 class Reporter:
 	def __init__(self, gamePlugin: GamePlugin):
 		self.gamePlugin = gamePlugin
-		self.lastReport = 0
 		self.reportInterval = 1.0
+		self.snapshotInterval: int = 100000000	# ns between hot path snapshots, 10Hz
+		self.lastTelemetrySnapshot: int = 0
+		self.lastPoseSnapshot: int = 0
+		self.lastAxisSnapshot: int = 0
+
+		# Snapshot slots, replaced whole so the render thread never sees a half written value
+		self.telemetry: dict = None
+		self.pose: tuple = None
+		self.axisCommands: tuple = None
+
+		# Loop timestamps in a fixed ring, the render thread derives rate and jitter from it
+		self.loopRingSize: int = 1024
+		self.loopTimes: [int] = [0] * self.loopRingSize
+		self.loopIndex: int = 0
+		self.loopCount: int = 0
+
+		self.thread = None
+		self.running = False
+
+	def start(self):
+		if self.thread is None:
+			self.running = True
+			self.thread = threading.Thread(target=self.run, name="Reporter", daemon=True)
+			self.thread.start()
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+	def markLoop(self):
+		self.loopTimes[self.loopIndex] = time.perf_counter_ns()
+		self.loopIndex = (self.loopIndex + 1) % self.loopRingSize
+		self.loopCount += 1
+
+	def snapshotTelemetry(self):
+		now = time.perf_counter_ns()
+		if now - self.lastTelemetrySnapshot >= self.snapshotInterval and self.gamePlugin.getRxStatus():
+			self.lastTelemetrySnapshot = now
+			self.telemetry = self.gamePlugin.data.__dict__.copy()
+
+	def snapshotPose(self, pose: DataFrame):
+		now = time.perf_counter_ns()
+		if now - self.lastPoseSnapshot >= self.snapshotInterval:
+			self.lastPoseSnapshot = now
+			self.pose = (pose.pitch, pose.roll, pose.yaw, pose.surge, pose.sway, pose.heave)
+
+	def snapshotAxes(self, commands: [float]):
+		now = time.perf_counter_ns()
+		if now - self.lastAxisSnapshot >= self.snapshotInterval:
+			self.lastAxisSnapshot = now
+			self.axisCommands = tuple(commands)
+
+	def run(self):
+		while self.running:
+			time.sleep(self.reportInterval)
+			sys.stdout.write(self.renderDashboard())
+			sys.stdout.flush()
 
-	def printTelemetryReport(self):
-		if (time.time() - self.lastReport > self.reportInterval) and self.gamePlugin.getRxStatus():
-			print("~~~!!!~~~")
-			for attr, value in self.gamePlugin.data.__dict__.items():
-				print(str(attr or "") + ": " + str(value or ""))
+	def loopStats(self) -> (float, float, float):
+		"""
+		:return: loop rate in Hz, interval standard deviation in ms and worst interval in ms over the ring
+		"""
+		count = min(self.loopCount, self.loopRingSize)
+		if count < 2:
+			return 0.0, 0.0, 0.0
+		end = self.loopIndex
+		times = [self.loopTimes[(end - count + i) % self.loopRingSize] for i in range(count)]
+		intervals = [(times[i + 1] - times[i]) / 1000000 for i in range(count - 1)]
+		mean = sum(intervals) / len(intervals)
+		deviation = (sum((x - mean) ** 2 for x in intervals) / len(intervals)) ** 0.5
+		rate = 1000.0 / mean if mean > 0 else 0.0
+		return rate, deviation, max(intervals)
 
-	def printAxisOutputReport(self, pose: DataFrame):
-		if time.time() - self.lastReport > self.reportInterval:
-			for attr, value in pose.__dict__.items():
-				print(str(attr or "") + ": " + str(value or ""))
+	def renderDashboard(self) -> str:
+		lines = ["\033[H\033[2J~~~ Game Motion Sim Control ~~~"]
+		rate, jitter, worst = self.loopStats()
+		lines.append(f"loop    {rate:8.1f} Hz   jitter {jitter:6.2f} ms   worst {worst:6.2f} ms")
+		lastPacket = self.gamePlugin.socket.lastPacket
+		if lastPacket > 0:
+			lines.append(f"packet  age {(time.time() - lastPacket) * 1000:8.1f} ms")
+		else:
+			lines.append("packet  none received")
+		pose = self.pose
+		if pose is not None:
+			lines.append("pose    " + "  ".join(
+				f"{name} {value:+.3f}" for name, value in zip(("pitch", "roll", "yaw", "surge", "sway", "heave"), pose)
+			))
+		axisCommands = self.axisCommands
+		if axisCommands is not None:
+			lines.append("axes    " + "  ".join(f"{i} {value:+.3f}" for i, value in enumerate(axisCommands)))
+		telemetry = self.telemetry
+		if telemetry is not None:
+			lines.append("")
+			for attr, value in telemetry.items():
+				lines.append(f"{attr:>22}: {value:.3f}")
+		return "\n".join(lines) + "\n"
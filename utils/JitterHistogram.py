@@ -0,0 +1,59 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+JitterHistogram buckets how far each interval of a periodic task lands from its nominal period. Buckets are fixed
+at construction so adding a sample never allocates.
+"""
+class JitterHistogram:
+	# Upper bucket edges in microseconds of absolute deviation from the nominal interval
+	bucketEdges = [50, 100, 250, 500, 1000, 2000, 5000, 10000]
+
+	def __init__(self, nominalNs: int):
+		self.nominalNs: int = nominalNs
+		self.reset()
+
+	def reset(self):
+		self.counts: [int] = [0] * (len(self.bucketEdges) + 1)
+		self.samples: int = 0
+		self.maxDeviation: int = 0		# ns
+		self.totalDeviation: int = 0	# ns
+
+	def add(self, intervalNs: int):
+		deviation = abs(intervalNs - self.nominalNs)
+		self.samples += 1
+		self.totalDeviation += deviation
+		if deviation > self.maxDeviation:
+			self.maxDeviation = deviation
+		deviationUs = deviation // 1000
+		for i, edge in enumerate(self.bucketEdges):
+			if deviationUs < edge:
+				self.counts[i] += 1
+				return
+		self.counts[-1] += 1
+
+	def copy(self):
+		out = JitterHistogram(self.nominalNs)
+		out.counts = list(self.counts)
+		out.samples = self.samples
+		out.maxDeviation = self.maxDeviation
+		out.totalDeviation = self.totalDeviation
+		return out
+
+	def render(self, title: str = "") -> str:
+		lines = [f"{title} {self.samples} intervals, nominal {self.nominalNs / 1000000:.2f} ms, "
+			f"mean deviation {self.totalDeviation / max(self.samples, 1) / 1000:.0f} us, "
+			f"max {self.maxDeviation / 1000:.0f} us"]
+		lower = 0
+		for i, count in enumerate(self.counts):
+			upper = self.bucketEdges[i] if i < len(self.bucketEdges) else None
+			label = f"{lower:>6}-{upper:<6} us" if upper is not None else f"{lower:>6}+       us"
+			share = count / self.samples if self.samples else 0.0
+			lines.append(f"  {label} {count:8d} {share * 100:6.2f}% " + "#" * int(share * 50))
+			lower = upper
+		return "\n".join(lines)
@@ -0,0 +1,152 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import struct
+import time
+import psutil
+from multiprocessing import shared_memory, resource_tracker
+from plugins.games.DirtRally2 import DataPacketUnpacked
+from utils.DataFrame import DataFrame
+from utils.SharedSeqlock import SeqlockBlock
+
+"""
+LivePublisher exposes the latest telemetry, normalized pose and per-axis commands in a named shared memory block so
+local overlays and loggers can poll them without sockets or console parsing. Readers map the block themselves and
+cost the motion loop nothing, however many there are.
+
+Fixed little endian layout, all values float64:
+	header		uint32 magic, uint16 version, uint16 axis count, uint16 telemetry field count, uint32 publisher pid,
+				2 bytes padding
+	input		uint64 sequence, publish time (perf_counter), telemetry fields in DataPacketUnpacked order,
+				normalized pitch, roll, yaw, surge, sway, heave
+	output		uint64 sequence, publish time (perf_counter), command per axis, controller target per axis
+Each section is a seqlock, read the sequence, copy, read it again and retry if it was odd or changed.
+
+Only one publisher runs per block name. A block left behind by a publisher that is no longer running is replaced,
+one still in use or not in this layout makes a second publisher refuse to start.
+"""
+
+liveName = "GameMotionSimLive"
+liveMagic = 0x474D534C
+liveVersion = 1
+headerFormat = struct.Struct("<IHHHI2x")
+telemetryFields = list(DataPacketUnpacked.__annotations__)
+poseAxes = ["pitch", "roll", "yaw", "surge", "sway", "heave"]
+publishedNames = set()	# Blocks created by a LivePublisher in this process
+
+
+def untrack(memory: shared_memory.SharedMemory):
+	"""
+	Attaching registers the block with this process's resource tracker (always before Python 3.13), which unlinks it
+	when the process exits. Only for blocks this process attached to, never for one it created.
+	"""
+	if os.name == "posix":
+		resource_tracker.unregister(memory._name, "shared_memory")
+
+
+def attachBlock(name: str) -> shared_memory.SharedMemory:
+	"""
+	Attach to an existing block without tying its lifetime to this process
+	"""
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		memory = shared_memory.SharedMemory(name=name)
+		# A publisher in this process shares the same tracker entry, it unregisters it when it unlinks
+		if name not in publishedNames:
+			untrack(memory)
+		return memory
+
+
+class LivePublisher:
+	def __init__(self, axisCount: int, name: str = liveName):
+		self.axisCount = axisCount
+		self.inputFields = 1 + len(telemetryFields) + len(poseAxes)
+		self.outputFields = 1 + axisCount * 2
+		size = headerFormat.size + 16 + 8 * (self.inputFields + self.outputFields)
+		if name in publishedNames:
+			raise FileExistsError("Shared memory block " + name + " is already published by this process")
+		try:
+			self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+		except FileExistsError:
+			self.replaceStaleBlock(name)
+			self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+		self.name = name
+		publishedNames.add(name)
+		self.memory.buf[:size] = bytes(size)
+		headerFormat.pack_into(self.memory.buf, 0, liveMagic, liveVersion, axisCount, len(telemetryFields), os.getpid())
+		self.inputBlock = SeqlockBlock(self.memory.buf, headerFormat.size, self.inputFields)
+		self.outputBlock = SeqlockBlock(self.memory.buf, headerFormat.size + self.inputBlock.size, self.outputFields)
+
+	def replaceStaleBlock(self, name: str):
+		"""
+		Unlink a block left behind by a publisher that did not shut down cleanly, refuse to touch anything else
+		"""
+		existing = shared_memory.SharedMemory(name=name)
+		magic, owner = 0, 0
+		if existing.size >= headerFormat.size:
+			magic, _, _, _, owner = headerFormat.unpack_from(existing.buf, 0)
+		if magic != liveMagic or (owner and psutil.pid_exists(owner)):
+			untrack(existing)
+			existing.close()
+			if magic != liveMagic:
+				raise FileExistsError("Shared memory block " + name + " exists and is not a live publisher block")
+			raise FileExistsError("Shared memory block " + name + " is already published by process " + str(owner))
+		existing.close()
+		existing.unlink()
+
+	def publishInput(self, data: DataPacketUnpacked, pose: DataFrame):
+		values = [time.perf_counter()]
+		values += [getattr(data, field) for field in telemetryFields]
+		values += [pose.pitch, pose.roll, pose.yaw, pose.surge, pose.sway, pose.heave]
+		self.inputBlock.write(values)
+
+	def publishOutput(self, commands: [float], targets: [int]):
+		self.outputBlock.write([time.perf_counter()] + commands + targets)
+
+	def close(self):
+		self.inputBlock = None
+		self.outputBlock = None
+		self.memory.close()
+		self.memory.unlink()
+		publishedNames.discard(self.name)
+
+
+class LiveReader:
+	"""
+	Python side of the layout above, for local tools
+	"""
+	def __init__(self, name: str = liveName):
+		self.memory = attachBlock(name)
+		magic, version, self.axisCount, telemetryCount, _ = headerFormat.unpack_from(self.memory.buf, 0)
+		if magic != liveMagic or version != liveVersion or telemetryCount != len(telemetryFields):
+			raise ValueError("Shared memory block " + name + " does not match this layout")
+		self.inputBlock = SeqlockBlock(self.memory.buf, headerFormat.size, 1 + telemetryCount + len(poseAxes))
+		self.outputBlock = SeqlockBlock(self.memory.buf, headerFormat.size + self.inputBlock.size,
+			1 + self.axisCount * 2)
+
+	def readInput(self) -> (int, dict):
+		sequence, values = self.inputBlock.read()
+		out = {"time": values[0]}
+		out.update(zip(telemetryFields, values[1:1 + len(telemetryFields)]))
+		out.update(zip(["normalized_" + axis for axis in poseAxes], values[1 + len(telemetryFields):]))
+		return sequence, out
+
+	def readOutput(self) -> (int, dict):
+		sequence, values = self.outputBlock.read()
+		return sequence, {
+			"time": values[0],
+			"commands": list(values[1:1 + self.axisCount]),
+			"targets": [int(value) for value in values[1 + self.axisCount:]],
+		}
+
+	def close(self):
+		self.inputBlock = None
+		self.outputBlock = None
+		self.memory.close()
@@ -0,0 +1,108 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import time
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+"""
+MetricsExporter serves the health counters kept by InputHandler, MotionSystem and DriverSerial in Prometheus text
+format over HTTP on localhost. Counters are only read when scraped, from the exporter's own thread, so the motion
+loop pays nothing beyond the integer increments it already does.
+"""
+
+
+class MetricsExporter:
+	def __init__(self, inputSystem, motionSystem, comHandler, host: str = "127.0.0.1", port: int = 9108):
+		self.inputSystem = inputSystem
+		self.motionSystem = motionSystem
+		self.comHandler = comHandler
+		self.host = host
+		self.port = port
+		self.server = None
+		self.thread = None
+
+	def start(self):
+		exporter = self
+
+		class MetricsRequestHandler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				if self.path != "/metrics":
+					self.send_error(404)
+					return
+				body = exporter.renderMetrics().encode()
+				self.send_response(200)
+				self.send_header("Content-Type", "text/plain; version=0.0.4")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				# Keep scrapes off the console
+				pass
+
+		self.server = HTTPServer((self.host, self.port), MetricsRequestHandler)
+		self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsExporter", daemon=True)
+		self.thread.start()
+		print("Metrics at http://" + self.host + ":" + str(self.server.server_port) + "/metrics")
+
+	def stop(self):
+		if self.server is not None:
+			self.server.shutdown()
+			self.server.server_close()
+			self.thread.join()
+			self.server = None
+			self.thread = None
+
+	def renderMetrics(self) -> str:
+		lines = []
+
+		def metric(name: str, metricType: str, helpText: str, samples):
+			lines.append("# HELP gmsc_" + name + " " + helpText)
+			lines.append("# TYPE gmsc_" + name + " " + metricType)
+			for labels, value in samples:
+				lines.append("gmsc_" + name + labels + " " + repr(float(value)))
+
+		inputSystem = self.inputSystem
+		udp = inputSystem.gamePlugin.socket
+		metric("loop_total", "counter", "Input loop iterations", [("", inputSystem.loopCount)])
+		metric("loop_delta_seconds", "gauge", "Duration of the last input loop", [("", inputSystem.loopDelta)])
+		metric("packets_total", "counter", "Telemetry datagrams received", [("", udp.packetCount)])
+		metric("packet_timeouts_total", "counter", "Telemetry timeouts that cleared the input", [("", udp.timeoutCount)])
+		jitterBuffer = inputSystem.gamePlugin.jitterBuffer
+		metric("frames_total", "counter", "Telemetry frames by jitter buffer outcome", [
+			('{outcome="accepted"}', jitterBuffer.accepted),
+			('{outcome="duplicate"}', jitterBuffer.duplicates),
+			('{outcome="stale"}', jitterBuffer.stale),
+		])
+		metric("frame_gaps_total", "counter", "Forward jumps in game time beyond the usual interval",
+			[("", jitterBuffer.gaps)])
+		metric("frame_resets_total", "counter", "Game time restarts", [("", jitterBuffer.resets)])
+		metric("dead_reckoned_total", "counter", "Updates extrapolated over a missing frame",
+			[("", jitterBuffer.deadReckoned)])
+		if udp.lastPacket > 0:
+			metric("packet_age_seconds", "gauge", "Time since the last telemetry datagram",
+				[("", time.time() - udp.lastPacket)])
+
+		motionSystem = self.motionSystem
+		metric("commands_total", "counter", "Motion commands generated", [("", motionSystem.commandCount)])
+		metric("axis_command", "gauge", "Last normalized command per axis",
+			[('{axis="' + str(i) + '"}', value) for i, value in enumerate(motionSystem.commands)])
+		metric("axis_clip_total", "counter", "Commands clamped to the controller range per axis",
+			[('{axis="' + str(i) + '"}', motionSystem.outputDriver.clipCounts[i])
+				for i in range(len(motionSystem.axisHandlers))])
+
+		com = self.comHandler
+		metric("serial_write_seconds", "summary", "Serial write call duration",
+			[("_sum", com.writeTimeTotal / 1000000000), ("_count", com.writeCount)])
+		metric("serial_write_max_seconds", "gauge", "Slowest serial write", [("", com.writeTimeMax / 1000000000)])
+		metric("serial_write_errors_total", "counter", "Failed serial writes", [("", com.writeErrorCount)])
+		metric("serial_reconnects_total", "counter", "Serial reconnect attempts", [("", com.reconnectCount)])
+		metric("serial_tick_overruns_total", "counter", "Serial output slots missed entirely",
+			[("", com.timer.overruns)])
+		return "\n".join(lines) + "\n"
@@ -0,0 +1,80 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+P2Quantile estimates a single quantile of a stream in constant memory using the P-squared algorithm (Jain and
+Chlamtac, 1985). Five markers are nudged toward their ideal positions with a piecewise-parabolic fit, so adding a
+sample never grows any storage.
+"""
+class P2Quantile:
+	def __init__(self, quantile: float):
+		self.quantile = quantile
+		self.reset()
+
+	def reset(self):
+		p = self.quantile
+		self.count: int = 0
+		self.heights: [float] = [0.0] * 5
+		self.positions: [int] = [0, 1, 2, 3, 4]
+		self.desired: [float] = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+		self.increments: [float] = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+	def add(self, value: float):
+		q = self.heights
+		n = self.positions
+		if self.count < 5:
+			q[self.count] = value
+			self.count += 1
+			if self.count == 5:
+				q.sort()
+			return
+		self.count += 1
+
+		# Find the cell the value falls in, stretching the extremes if needed
+		if value < q[0]:
+			q[0] = value
+			k = 0
+		elif value < q[1]:
+			k = 0
+		elif value < q[2]:
+			k = 1
+		elif value < q[3]:
+			k = 2
+		elif value <= q[4]:
+			k = 3
+		else:
+			q[4] = value
+			k = 3
+		for i in range(k + 1, 5):
+			n[i] += 1
+		for i in range(5):
+			self.desired[i] += self.increments[i]
+
+		# Adjust the three middle markers
+		for i in range(1, 4):
+			d = self.desired[i] - n[i]
+			if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+				step = 1 if d > 0 else -1
+				candidate = q[i] + step / (n[i + 1] - n[i - 1]) * (
+					(n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+					+ (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+				)
+				if q[i - 1] < candidate < q[i + 1]:
+					q[i] = candidate
+				else:
+					q[i] = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+				n[i] += step
+
+	def value(self) -> float:
+		if self.count >= 5:
+			return self.heights[2]
+		if self.count == 0:
+			return 0.0
+		# Too few samples for the markers, fall back to the nearest rank of what has been seen
+		seen = sorted(self.heights[:self.count])
+		return seen[min(int(self.quantile * self.count), self.count - 1)]
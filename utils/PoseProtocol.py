@@ -0,0 +1,46 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import struct
+from utils.DataFrame import DataFrame
+
+"""
+Compact pose protocol for split-host operation. Each datagram carries one normalized pose as six float32 values
+with a sequence number and the sender's wall clock time, 40 bytes instead of the 264 byte game packet.
+
+	uint16 magic, uint16 version, uint32 sequence, uint64 sent time (ns since epoch),
+	float32 pitch, roll, yaw, surge, sway, heave			little endian
+"""
+
+poseMagic = 0x4D50
+poseVersion = 1
+poseFormat = struct.Struct("<HHIQ6f")
+
+
+def packPose(sequence: int, sentNs: int, pose: DataFrame) -> bytes:
+	return poseFormat.pack(poseMagic, poseVersion, sequence & 0xFFFFFFFF, sentNs,
+		pose.pitch, pose.roll, pose.yaw, pose.surge, pose.sway, pose.heave)
+
+
+def unpackPose(datagram) -> (int, int, DataFrame):
+	"""
+	:return: sequence, sent time in ns and the pose, or None for anything that is not a pose datagram
+	"""
+	if len(datagram) != poseFormat.size:
+		return None
+	magic, version, sequence, sentNs, pitch, roll, yaw, surge, sway, heave = poseFormat.unpack(datagram)
+	if magic != poseMagic or version != poseVersion:
+		return None
+	pose = DataFrame()
+	pose.pitch = pitch
+	pose.roll = roll
+	pose.yaw = yaw
+	pose.surge = surge
+	pose.sway = sway
+	pose.heave = heave
+	return sequence, sentNs, pose
@@ -0,0 +1,110 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import gc
+import os
+import sys
+import time
+import psutil
+
+"""
+RealtimeTuning trims the scheduling and GC stalls that show up as jolts. It pins the process to a core, raises its
+scheduling priority where permitted, freezes everything allocated during startup out of the cyclic GC and then
+runs collections only in the idle gap after a serial frame has gone out, young generations as they fill up and a
+full collection whenever the oldest generation reaches its threshold.
+
+Before applying anything it lets DriverSerial collect a baseline tick jitter histogram, timed from the first serial
+frame rather than from startup so a long game search does not cut it short, then collects a second one with tuning
+active and prints both.
+"""
+class RealtimeTuning:
+	def __init__(self, cpus: [int] = None, fifoPriority: int = None, gcMode: str = "idle"):
+		self.cpus = cpus				# None pins to the last available core
+		# SCHED_FIFO is opt-in, a FIFO task that never sleeps hits the kernel RT throttle and stalls for tens of ms
+		self.fifoPriority = fifoPriority
+		self.gcMode = gcMode			# "idle" collects in gaps, "off" never collects and leaks cyclic garbage
+		self.baselineSeconds: float = 10.0
+		self.minimumSamples: int = 500	# Intervals each histogram needs before it is worth comparing
+		self.started: float = 0.0		# Start of the baseline window, set on the first idle() call
+		self.applied: bool = False
+		self.appliedAt: float = 0.0
+		self.resetPending: bool = False
+		self.reported: bool = False
+		self.baseline = None
+
+	def apply(self):
+		self.pinCpu()
+		self.raisePriority()
+		gc.collect()
+		gc.freeze()
+		gc.disable()
+		self.applied = True
+		self.appliedAt = time.perf_counter()
+
+	def pinCpu(self):
+		process = psutil.Process()
+		try:
+			cpus = self.cpus or [process.cpu_affinity()[-1]]
+			process.cpu_affinity(cpus)
+			print("Pinned to CPU " + ", ".join(str(cpu) for cpu in cpus))
+		except (psutil.Error, AttributeError, ValueError) as err:
+			# cpu_affinity is not available on every platform
+			print("CPU pinning unavailable: " + str(err))
+
+	def raisePriority(self):
+		if self.fifoPriority is not None and hasattr(os, "sched_setscheduler"):
+			try:
+				os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.fifoPriority))
+				print("Scheduling SCHED_FIFO priority " + str(self.fifoPriority))
+				return
+			except PermissionError:
+				print("Not permitted to use SCHED_FIFO, falling back to nice")
+		process = psutil.Process()
+		try:
+			if sys.platform == "win32":
+				process.nice(psutil.HIGH_PRIORITY_CLASS)
+			else:
+				process.nice(-10)
+			print("Raised process priority")
+		except psutil.AccessDenied:
+			print("Not permitted to raise priority, running at normal priority")
+
+	def idle(self, comHandler):
+		"""
+		Call right after a serial frame has been sent, the next deadline is a full interval away
+		"""
+		if self.resetPending:
+			# The interval that spanned apply() has now been recorded, leave its one-off cost out of the comparison
+			comHandler.tickJitter.reset()
+			self.appliedAt = time.perf_counter()
+			self.resetPending = False
+		if self.applied:
+			if self.gcMode == "idle":
+				count0, count1, count2 = gc.get_count()
+				threshold0, threshold1, threshold2 = gc.get_threshold()
+				# Each collect(1) counts towards generation 2, so cyclic garbage promoted there is still reclaimed
+				if count2 >= threshold2:
+					gc.collect(2)
+				elif count1 >= threshold1:
+					gc.collect(1)
+				elif count0 >= threshold0:
+					gc.collect(0)
+			if not self.reported and time.perf_counter() - self.appliedAt >= self.baselineSeconds \
+					and comHandler.tickJitter.samples >= self.minimumSamples:
+				self.reported = True
+				print(self.baseline.render("\nTick jitter before realtime tuning:"))
+				print(comHandler.tickJitter.render("Tick jitter with realtime tuning:"))
+		elif not self.started:
+			# First frame out, drop whatever intervals startup and the game search left in the histogram
+			comHandler.tickJitter.reset()
+			self.started = time.perf_counter()
+		elif time.perf_counter() - self.started >= self.baselineSeconds \
+				and comHandler.tickJitter.samples >= self.minimumSamples:
+			self.baseline = comHandler.tickJitter.copy()
+			self.apply()
+			self.resetPending = True
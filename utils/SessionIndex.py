@@ -0,0 +1,120 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import numpy as np
+from utils.SessionRecorder import loadSegments
+
+"""
+SessionIndex indexes a recorded session by lap and track position so the same stretch of road can be pulled out of
+every lap without scanning the recording. For each lap it keeps the row numbers sorted by lapDistance, a window of
+track is then two binary searches plus reading only the matching rows from the memory-mapped segments.
+
+The index is cached next to the session as lap_index.npz and rebuilt when segments are added.
+"""
+
+lapColumn = "telemetry_currentLap"
+distanceColumn = "telemetry_lapDistance"
+
+
+class SessionIndex:
+	def __init__(self, path: str):
+		self.path = path
+		self.indexPath = os.path.join(path, "lap_index.npz")
+		self.segments = loadSegments(path)
+		self.segmentStarts = np.cumsum([0] + [len(segment[lapColumn]) for segment in self.segments])
+		if not self.loadIndex():
+			self.buildIndex()
+
+	def loadIndex(self) -> bool:
+		if not os.path.exists(self.indexPath):
+			return False
+		index = np.load(self.indexPath)
+		if int(index["rowCount"]) != self.segmentStarts[-1]:
+			return False
+		self.readIndex(index)
+		return True
+
+	def buildIndex(self):
+		laps = np.concatenate([segment[lapColumn] for segment in self.segments]) if self.segments else np.empty(0)
+		distances = np.concatenate([segment[distanceColumn] for segment in self.segments]) \
+			if self.segments else np.empty(0)
+		# Group by lap, then by distance within the lap
+		order = np.lexsort((distances, laps))
+		sortedLaps = laps[order]
+		lapValues, lapStarts = np.unique(sortedLaps, return_index=True)
+		np.savez(
+			self.indexPath,
+			rowCount=self.segmentStarts[-1],
+			laps=lapValues,
+			lapOffsets=np.append(lapStarts, len(order)),
+			distances=distances[order],
+			rows=order,
+		)
+		self.readIndex(np.load(self.indexPath))
+
+	def readIndex(self, index):
+		self.laps = index["laps"]
+		self.lapOffsets = index["lapOffsets"]
+		self.distances = index["distances"]
+		self.rows = index["rows"]
+
+	def lapRows(self, lap: float, start: float, end: float) -> np.ndarray:
+		"""
+		:return: rows of the lap between start and end metres, in recording order. A window with start past end
+			wraps over the finish line into the start of the next lap.
+		"""
+		if start <= end:
+			selected = self.windowRows(lap, start, end)
+		else:
+			selected = np.concatenate([self.windowRows(lap, start, np.inf), self.windowRows(lap + 1, -np.inf, end)])
+		return np.sort(selected)
+
+	def windowRows(self, lap: float, start: float, end: float) -> np.ndarray:
+		position = np.searchsorted(self.laps, lap)
+		if position == len(self.laps) or self.laps[position] != lap:
+			return np.empty(0, dtype=np.int64)
+		first, last = self.lapOffsets[position], self.lapOffsets[position + 1]
+		lower, upper = np.searchsorted(self.distances[first:last], [start, end], side="left")
+		return self.rows[first + lower:first + upper]
+
+	def readRows(self, rows: np.ndarray, columns: [str]) -> dict:
+		"""
+		Gather rows from the memory-mapped segments, only the pages holding those rows are read
+		"""
+		segmentOfRow = np.searchsorted(self.segmentStarts, rows, side="right") - 1
+		out = {column: np.empty(len(rows)) for column in columns}
+		for segment in np.unique(segmentOfRow):
+			mask = segmentOfRow == segment
+			localRows = rows[mask] - self.segmentStarts[segment]
+			for column in columns:
+				out[column][mask] = self.segments[segment][column][localRows]
+		return out
+
+	def fetch(self, lap: float, start: float, end: float, columns: [str]) -> dict:
+		return self.readRows(self.lapRows(lap, start, end), columns)
+
+
+class SessionLibrary:
+	"""
+	A set of indexed sessions, for comparing one piece of track across laps and tuning runs
+	"""
+	def __init__(self, paths: [str]):
+		self.sessions = {path: SessionIndex(path) for path in paths}
+
+	def sameCorner(self, start: float, end: float, columns: [str]) -> [(str, float, dict)]:
+		"""
+		:return: (session path, lap, column arrays) for every lap of every session passing through the window
+		"""
+		out = []
+		for path, index in self.sessions.items():
+			for lap in index.laps:
+				rows = index.lapRows(lap, start, end)
+				if len(rows):
+					out.append((path, float(lap), index.readRows(rows, columns)))
+		return out
@@ -0,0 +1,150 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import json
+import time
+import queue
+import threading
+import numpy as np
+from plugins.games.DirtRally2 import DataPacketUnpacked
+
+"""
+SessionRecorder logs every pipeline stage once per output frame into chunked columnar files. The motion loop only
+writes one row into a preallocated chunk, full chunks are handed to a background writer that saves each column as a
+.npy file in its own segment directory. Chunks come from a fixed pool, if the writer falls behind frames are dropped
+and counted rather than letting memory grow.
+
+The command columns are the per-axis commands before any filter bank, so a session recorded with --filters can be
+analysed again without the old filters baked in. The bank in use is noted in session.json, targets are as sent.
+
+Layout:
+	session/session.json			column names, recording settings and the filter bank in use
+	session/segment_000000/<column>.npy
+	session/segment_000001/<column>.npy
+"""
+
+poseAxes = ["pitch", "roll", "yaw", "surge", "sway", "heave"]
+telemetryFields = list(DataPacketUnpacked.__annotations__)
+
+
+def sessionColumns(axisCount: int) -> [str]:
+	columns = ["time"]
+	columns += ["telemetry_" + field for field in telemetryFields]
+	columns += ["raw_" + axis for axis in poseAxes]
+	columns += ["normalized_" + axis for axis in poseAxes]
+	columns += ["scaled_" + axis for axis in poseAxes]
+	columns += ["command_" + str(i) for i in range(axisCount)]
+	columns += ["target_" + str(i) for i in range(axisCount)]
+	return columns
+
+
+class SessionRecorder:
+	def __init__(self, path: str, axisCount: int, chunkRows: int = 4096, chunkPool: int = 8, filters: str = None):
+		self.path = path
+		self.axisCount = axisCount
+		self.columns = sessionColumns(axisCount)
+		self.chunkRows = chunkRows
+		self.freeChunks = queue.Queue()
+		for _ in range(chunkPool):
+			self.freeChunks.put(np.empty((len(self.columns), chunkRows), dtype=np.float64))
+		self.fullChunks = queue.Queue()
+		self.chunk = self.freeChunks.get()
+		self.row: int = 0
+		self.segment: int = 0
+		self.recordedFrames: int = 0
+		self.droppedFrames: int = 0
+
+		os.makedirs(path, exist_ok=True)
+		with open(os.path.join(path, "session.json"), "w") as manifest:
+			json.dump({
+				"columns": self.columns,
+				"axisCount": axisCount,
+				"chunkRows": chunkRows,
+				"filters": filters,
+				"started": time.time(),
+			}, manifest, indent=1)
+
+		self.thread = threading.Thread(target=self.run, name="SessionRecorder", daemon=True)
+		self.thread.start()
+
+	def recordFrame(self, inputSystem, motionSystem):
+		if self.chunk is None:
+			# Writer is behind and every pooled chunk is in flight
+			try:
+				self.chunk = self.freeChunks.get_nowait()
+			except queue.Empty:
+				self.droppedFrames += 1
+				return
+		data = inputSystem.gamePlugin.data
+		raw = inputSystem.poseRaw
+		normalized = inputSystem.poseNormalized
+		scaled = motionSystem.poseHandler.outputs
+		values = [time.time()]
+		values += [getattr(data, field) for field in telemetryFields]
+		values += [raw.pitch, raw.roll, raw.yaw, raw.surge, raw.sway, raw.heave]
+		values += [normalized.pitch, normalized.roll, normalized.yaw, normalized.surge, normalized.sway,
+			normalized.heave]
+		values += [scaled.pitch, scaled.roll, scaled.yaw, scaled.surge, scaled.sway, scaled.heave]
+		values += motionSystem.unfilteredCommands
+		values += motionSystem.outputDriver.targets
+		self.chunk[:, self.row] = values
+		self.row += 1
+		self.recordedFrames += 1
+		if self.row == self.chunkRows:
+			self.handOff()
+
+	def handOff(self):
+		self.fullChunks.put((self.chunk, self.row))
+		self.row = 0
+		try:
+			self.chunk = self.freeChunks.get_nowait()
+		except queue.Empty:
+			self.chunk = None
+
+	def run(self):
+		while True:
+			chunk, rows = self.fullChunks.get()
+			if chunk is None:
+				return
+			segmentPath = os.path.join(self.path, "segment_" + str(self.segment).zfill(6))
+			os.makedirs(segmentPath, exist_ok=True)
+			for i, column in enumerate(self.columns):
+				np.save(os.path.join(segmentPath, column + ".npy"), chunk[i, :rows])
+			self.segment += 1
+			self.freeChunks.put(chunk)
+
+	def close(self):
+		if self.chunk is not None and self.row > 0:
+			self.handOff()
+		self.fullChunks.put((None, 0))
+		self.thread.join()
+
+
+def loadSegments(path: str, columns: [str] = None) -> [dict]:
+	"""
+	Memory-map every segment of a recorded session without reading it
+	:return: one dict per segment of column name to read-only array
+	"""
+	with open(os.path.join(path, "session.json")) as manifest:
+		names = columns or json.load(manifest)["columns"]
+	segments = []
+	for segment in sorted(entry for entry in os.listdir(path) if entry.startswith("segment_")):
+		segmentPath = os.path.join(path, segment)
+		segments.append({name: np.load(os.path.join(segmentPath, name + ".npy"), mmap_mode="r") for name in names})
+	return segments
+
+
+def loadSession(path: str, columns: [str] = None) -> dict:
+	"""
+	Load a recorded session as one contiguous array per column
+	"""
+	segments = loadSegments(path, columns)
+	if not segments:
+		return {}
+	return {name: np.concatenate([segment[name] for segment in segments]) for name in segments[0]}
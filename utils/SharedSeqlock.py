@@ -0,0 +1,116 @@
+# Copyright © 2024 Andrew Baum
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import struct
+import time
+from multiprocessing import shared_memory
+from utils.DataFrame import DataFrame
+
+"""
+SeqlockBlock is a single-writer, many-reader slot of float64 values in a shared buffer. The writer bumps the
+sequence to odd before writing and back to even after, readers retry until they see the same even sequence on both
+sides of their copy. Nothing is pickled or queued, a reader always gets the latest complete frame.
+"""
+class SeqlockBlock:
+	sequenceFormat = struct.Struct("<Q")
+
+	def __init__(self, buffer, offset: int, fieldCount: int):
+		self.buffer = buffer
+		self.offset = offset
+		self.valueOffset = offset + self.sequenceFormat.size
+		self.valueFormat = struct.Struct("<" + str(fieldCount) + "d")
+		self.size = self.sequenceFormat.size + self.valueFormat.size
+		self.sequence: int = self.sequenceFormat.unpack_from(self.buffer, self.offset)[0]
+
+	def write(self, values):
+		self.sequence += 1
+		self.sequenceFormat.pack_into(self.buffer, self.offset, self.sequence)
+		self.valueFormat.pack_into(self.buffer, self.valueOffset, *values)
+		self.sequence += 1
+		self.sequenceFormat.pack_into(self.buffer, self.offset, self.sequence)
+
+	def read(self) -> (int, tuple):
+		"""
+		:return: sequence number (even, 0 if never written) and the values of the latest complete write
+		"""
+		while True:
+			before = self.sequenceFormat.unpack_from(self.buffer, self.offset)[0]
+			if before & 1:
+				continue
+			values = self.valueFormat.unpack_from(self.buffer, self.valueOffset)
+			after = self.sequenceFormat.unpack_from(self.buffer, self.offset)[0]
+			if before == after:
+				return before, values
+
+
+"""
+SharedPoseSlot hands the latest normalized pose from the input process to the output process. The pose block holds
+the publish time plus the six axes, the stats block is written back by the output side so a supervisor can report
+the handoff latency without either worker printing.
+"""
+class SharedPoseSlot:
+	poseFields = 7		# perf_counter timestamp, pitch, roll, yaw, surge, sway, heave
+	statsFields = 5		# consumed, skipped, last latency, average latency, worst latency (seconds)
+
+	def __init__(self, name: str = None, create: bool = False):
+		size = (SeqlockBlock.sequenceFormat.size * 2) + 8 * (self.poseFields + self.statsFields)
+		self.memory = shared_memory.SharedMemory(name=name, create=create, size=size)
+		self.name = self.memory.name
+		if create:
+			self.memory.buf[:size] = bytes(size)
+		self.poseBlock = SeqlockBlock(self.memory.buf, 0, self.poseFields)
+		self.statsBlock = SeqlockBlock(self.memory.buf, self.poseBlock.size, self.statsFields)
+
+		# Reader side bookkeeping
+		self.lastSequence: int = 0
+		self.consumed: int = 0
+		self.skipped: int = 0
+		self.latencyLast: float = 0.0
+		self.latencyTotal: float = 0.0
+		self.latencyMax: float = 0.0
+
+	def writePose(self, pose: DataFrame):
+		self.poseBlock.write((time.perf_counter(), pose.pitch, pose.roll, pose.yaw, pose.surge, pose.sway, pose.heave))
+
+	def readPose(self) -> DataFrame:
+		"""
+		Read the latest pose and account for its handoff latency, the age of the pose when the output side first
+		picks it up. Poses overwritten before being read are counted as skipped.
+		"""
+		sequence, values = self.poseBlock.read()
+		if sequence != self.lastSequence and sequence != 0:
+			self.skipped += max(0, (sequence - self.lastSequence) // 2 - 1)
+			self.lastSequence = sequence
+			self.consumed += 1
+			self.latencyLast = time.perf_counter() - values[0]
+			self.latencyTotal += self.latencyLast
+			if self.latencyLast > self.latencyMax:
+				self.latencyMax = self.latencyLast
+			self.statsBlock.write((self.consumed, self.skipped, self.latencyLast,
+				self.latencyTotal / self.consumed, self.latencyMax))
+		out = DataFrame()
+		out.pitch, out.roll, out.yaw, out.surge, out.sway, out.heave = values[1:]
+		return out
+
+	def readStats(self) -> dict:
+		_, values = self.statsBlock.read()
+		return {
+			"consumed": int(values[0]),
+			"skipped": int(values[1]),
+			"latencyLast": values[2],
+			"latencyAvg": values[3],
+			"latencyMax": values[4],
+		}
+
+	def close(self):
+		self.poseBlock = None
+		self.statsBlock = None
+		self.memory.close()
+
+	def unlink(self):
+		self.memory.unlink()
@@ -7,26 +7,74 @@
 # THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import time
+from utils.JitterHistogram import JitterHistogram
 
 """
-TickTimer gives a tick interval timer for periodic actions on a fixed interval
+TickTimer gives a tick interval timer for periodic actions on a fixed interval.
+Deadlines are scheduled on an absolute grid, deadline += interval, so a late tick does not push back the ones after
+it and the rate cannot drift. Waiting sleeps until spinNs before the deadline and spin-waits the rest, trading a
+little CPU for sub-millisecond accuracy. Slots missed entirely are skipped and counted as overruns. Callers that stop
+polling on purpose, e.g. while searching for the game, reset() the grid afterwards so the pause is not counted.
 """
 class TickTimer:
-	# Interval in milliseconds
-	def __init__(self, interval: int):
-		self.interval: int = interval * 1000000
+	# Interval in milliseconds, fractions allowed
+	def __init__(self, interval: float, spinNs: int = 500000):
+		self.interval: int = int(interval * 1000000)
+		self.spinNs: int = spinNs			# Final part of each interval spent spinning instead of sleeping
 		self.tick: int = time.perf_counter_ns()
 		self.tock: int = 0
+		self.deadline: int = self.tick + self.interval
 		self.delta: float = 0.0
+		self.overruns: int = 0
+		self.jitter = JitterHistogram(self.interval)
 
 	def check(self) -> bool:
+		"""
+		Non-blocking poll. Inside the spin window it spins to the deadline so a loop that polls at least once per
+		window still fires on the exact slot.
+		"""
 		self.tock = time.perf_counter_ns()
-		if self.tock - self.tick >= self.interval:
-			self.delta = (self.tock - self.tick) / 1000000000
-			self.tick = self.tock
-			return True
-		else:
+		if self.deadline - self.tock > self.spinNs:
 			return False
+		while self.tock < self.deadline:
+			self.tock = time.perf_counter_ns()
+		self.advance()
+		return True
+
+	def wait(self):
+		"""
+		Block until the next deadline, sleeping for all but the spin window
+		"""
+		sleepNs = self.deadline - time.perf_counter_ns() - self.spinNs
+		if sleepNs > 0:
+			time.sleep(sleepNs / 1000000000)
+		self.tock = time.perf_counter_ns()
+		while self.tock < self.deadline:
+			self.tock = time.perf_counter_ns()
+		self.advance()
+
+	def advance(self):
+		self.delta = (self.tock - self.tick) / 1000000000
+		self.jitter.add(self.tock - self.tick)
+		self.tick = self.tock
+		self.deadline += self.interval
+		if self.tock >= self.deadline:
+			# Fell more than a whole interval behind, skip to the next slot still ahead on the grid
+			missed = (self.tock - self.deadline) // self.interval + 1
+			self.overruns += missed
+			self.deadline += missed * self.interval
+
+	def reset(self):
+		"""
+		Re-anchor the grid on now after the caller stopped polling for a while, without recording jitter or overruns
+		for the pause
+		"""
+		self.tick = time.perf_counter_ns()
+		self.deadline = self.tick + self.interval
+
+	# Returns seconds until the timer starts spinning for its next deadline, for bounding blocking calls
+	def timeUntilSpin(self) -> float:
+		return (self.deadline - self.spinNs - time.perf_counter_ns()) / 1000000000
 
 	# Returns frame delta as a float in fractional seconds since last frame
 	def getDelta(self) -> float: